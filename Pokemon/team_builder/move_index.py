@@ -0,0 +1,152 @@
+import argparse
+import ast
+import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from pokemon_dataset import NEW_DATA_DIR, TYPES, TYPE_INDEX, load_dataset, mask_types
+
+# --- Configuration ---
+MOVES_JSON = os.path.join(NEW_DATA_DIR, "moves_data.json")
+MOVESET_CSV = os.path.join(NEW_DATA_DIR, "pokemon_data_with_moveset.csv")
+
+# Compiled arrays, memory-mapped on load and rebuilt when either source file changes
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "move_index")
+# --- End Configuration ---
+
+NO_VALUE = -1 # accuracy / pp of moves that have none (e.g. never-miss moves)
+OTHER_TYPE = len(TYPES) # move_type of moves outside the 18-type chart (the Colosseum/XD 'shadow' moves)
+
+
+def sources_hash(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def replace_file(path, write):
+    """Calls write(f) on a temporary file, then moves it over `path`, so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def build_move_index(dataset, moves_json=MOVES_JSON, moveset_csv=MOVESET_CSV, out_dir=INDEX_DIR):
+    """Compiles moves_data.json and the movesets into typed arrays aligned with the dataset's rows.
+
+    Returns the number of moves.
+    """
+    with open(moves_json, 'r', encoding='utf-8') as f:
+        moves = json.load(f)
+
+    move_names = sorted(moves)
+    move_id = {name: i for i, name in enumerate(move_names)}
+    categories = sorted({((moves[name].get('meta') or {}).get('category') or {}).get('name') or '' for name in move_names})
+    category_id = {name: i for i, name in enumerate(categories)}
+
+    power = np.array([moves[name]['power'] or 0 for name in move_names], dtype=np.int16)
+    accuracy = np.array([NO_VALUE if moves[name]['accuracy'] is None else moves[name]['accuracy'] for name in move_names], dtype=np.int16)
+    pp = np.array([NO_VALUE if moves[name]['pp'] is None else moves[name]['pp'] for name in move_names], dtype=np.int16)
+    move_type = np.array([TYPE_INDEX.get(moves[name]['type'], OTHER_TYPE) for name in move_names], dtype=np.uint8)
+    category = np.array([category_id[((moves[name].get('meta') or {}).get('category') or {}).get('name') or ''] for name in move_names], dtype=np.uint8)
+
+    # CSR adjacency: the moves of dataset row i are move_ids[move_ptr[i]:move_ptr[i + 1]]
+    learnsets = [[] for _ in range(len(dataset))]
+    with open(moveset_csv, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            i = dataset.index.get(row['name'])
+            if i is not None:
+                learnsets[i] = sorted({move_id[move] for move in ast.literal_eval(row['moveset']) if move in move_id})
+    move_ptr = np.zeros(len(dataset) + 1, dtype=np.int32)
+    move_ptr[1:] = np.cumsum([len(learnset) for learnset in learnsets])
+    move_ids = np.array([move for learnset in learnsets for move in learnset], dtype=np.int32)
+
+    # Best power per (species, attacking type): one unbuffered max-scatter over every learnable move
+    species_of_move = np.repeat(np.arange(len(dataset)), np.diff(move_ptr))
+    charted = move_type[move_ids] != OTHER_TYPE
+    best_power = np.zeros((len(dataset), len(TYPES)), dtype=np.int16)
+    np.maximum.at(best_power, (species_of_move[charted], move_type[move_ids][charted]), power[move_ids][charted])
+
+    columns = {'move_names': np.array(move_names), 'power': power, 'accuracy': accuracy, 'pp': pp,
+               'move_type': move_type, 'category': category, 'move_ptr': move_ptr, 'move_ids': move_ids,
+               'best_power': best_power}
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in columns.items():
+        replace_file(os.path.join(out_dir, f"{name}.npy"), lambda f: np.save(f, array))
+    # Written last: an index without meta.json is treated as missing and rebuilt
+    meta = {'sources_sha256': sources_hash(moves_json, moveset_csv), 'species': [str(name) for name in dataset.names],
+            'categories': categories, 'types': TYPES}
+    replace_file(os.path.join(out_dir, "meta.json"), lambda f: f.write(json.dumps(meta).encode('utf-8')))
+    return len(move_names)
+
+
+class MoveIndex:
+    """Memory-mapped move table plus per-species learnsets, rows aligned with PokemonDataset.
+
+    Move columns (indexed by move id): move_names, power (0 = no damage), accuracy and pp
+    (NO_VALUE if none), move_type (TYPES index or OTHER_TYPE), category (index into .categories).
+    Species columns: move_ptr / move_ids (CSR learnsets) and best_power, the strongest
+    learnable move of each attacking type (N x 18, 0 = none).
+    """
+
+    def __init__(self, out_dir=INDEX_DIR):
+        for name in ('move_names', 'power', 'accuracy', 'pp', 'move_type', 'category', 'move_ptr', 'move_ids', 'best_power'):
+            setattr(self, name, np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode='r'))
+        with open(os.path.join(out_dir, "meta.json"), 'r', encoding='utf-8') as f:
+            self.categories = json.load(f)['categories']
+        self.move_id = {str(name): i for i, name in enumerate(self.move_names)}
+
+    def learnset(self, i):
+        """Move ids dataset row i can learn."""
+        return self.move_ids[self.move_ptr[i]:self.move_ptr[i + 1]]
+
+    def stab_power(self, dataset):
+        """(N,) best power among each species' moves of its own types: best_power masked by the type bitmask."""
+        own_types = (np.asarray(dataset.type_mask, dtype=np.uint32)[:, None] >> np.arange(len(TYPES), dtype=np.uint32)) & 1
+        return (np.asarray(self.best_power) * own_types).max(axis=1)
+
+    def attack_type_mask(self):
+        """(N,) bitmask of the attacking types each species has a damaging move of."""
+        has_move = np.asarray(self.best_power) > 0
+        return (has_move.astype(np.uint32) << np.arange(len(TYPES), dtype=np.uint32)).sum(axis=1, dtype=np.uint32)
+
+
+def is_stale(dataset, moves_json=MOVES_JSON, moveset_csv=MOVESET_CSV, out_dir=INDEX_DIR):
+    """True if the index is missing, built from other sources, or aligned to other dataset rows."""
+    try:
+        with open(os.path.join(out_dir, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return True
+    return (meta.get('sources_sha256') != sources_hash(moves_json, moveset_csv)
+            or len(meta.get('species', [])) != len(dataset) or meta['species'] != [str(name) for name in dataset.names])
+
+
+def load_move_index(dataset=None, moves_json=MOVES_JSON, moveset_csv=MOVESET_CSV, out_dir=INDEX_DIR):
+    """Returns the MoveIndex, compiling it first if the JSON, the movesets or the dataset changed."""
+    dataset = dataset or load_dataset()
+    if is_stale(dataset, moves_json, moveset_csv, out_dir):
+        build_move_index(dataset, moves_json, moveset_csv, out_dir)
+    return MoveIndex(out_dir)
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile moves_data.json and the movesets into a typed move index.")
+    parser.add_argument('--out', default=INDEX_DIR)
+    args = parser.parse_args()
+
+    dataset = load_dataset()
+    count = build_move_index(dataset, out_dir=args.out)
+    index = MoveIndex(args.out)
+    print(f"Compiled {count} moves and {len(index.move_ids)} learnset entries for {len(dataset)} Pokémon into {os.path.abspath(args.out)}")
+    example = dataset.index['clodsire']
+    best = {TYPES[t]: int(p) for t, p in enumerate(index.best_power[example]) if p}
+    print(f"  clodsire: {len(index.learnset(example))} moves, best power by type {best}")
+    print(f"  STAB power {int(index.stab_power(dataset)[example])} ({', '.join(mask_types(int(dataset.type_mask[example])))})")
@@ -0,0 +1,138 @@
+import argparse
+import ast
+import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# --- Configuration ---
+NEW_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "new_data")
+SOURCE_CSV = os.path.join(NEW_DATA_DIR, "pokemon_data.csv")
+
+# Where the typed columns are written (one .npy per column, memory-mapped on load)
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "columnar")
+# --- End Configuration ---
+
+# Canonical type order: column j of the weakness matrix (defending type) and bit j of the type mask
+TYPES = ('normal', 'fire', 'water', 'electric', 'grass', 'ice', 'fighting', 'poison', 'ground',
+         'flying', 'psychic', 'bug', 'rock', 'ghost', 'dragon', 'dark', 'steel', 'fairy')
+TYPE_INDEX = {name: i for i, name in enumerate(TYPES)}
+
+STAT_NAMES = ('hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed')
+
+# Column file -> dtype. Stats fit in int16 (max 255 per stat), multipliers (0..4) in float32.
+COLUMNS = {
+    'names': None, # Fixed-width unicode, sized to the longest name
+    'stats': np.int16, # N x 6, in STAT_NAMES order
+    'stats_total': np.int16, # N
+    'weakness': np.float32, # N x 18 multipliers of the Pokemon's own types attacking each type (not damage taken), in TYPES order
+    'type_mask': np.uint32, # N, bit j set if the Pokemon has type TYPES[j]
+}
+
+
+def type_mask(type_names):
+    """Bitmask of a list of type names (bit j = TYPES[j])."""
+    mask = 0
+    for name in type_names:
+        mask |= 1 << TYPE_INDEX[name]
+    return mask
+
+
+def mask_types(mask):
+    """Type names whose bit is set in `mask`, in canonical order."""
+    return [name for j, name in enumerate(TYPES) if mask >> j & 1]
+
+
+def source_hash(csv_path):
+    """Content hash of the CSV; unlike mtimes it survives a fresh git checkout."""
+    with open(csv_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_dataset(csv_path=SOURCE_CSV, out_dir=DATASET_DIR):
+    """Parses pokemon_data.csv once (literal_eval on the stringified columns) and writes typed columns."""
+    names, stats, totals, weakness, masks = [], [], [], [], []
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            multipliers = ast.literal_eval(row['weakness'])
+            names.append(row['name'])
+            stats.append(ast.literal_eval(row['individual_stats']))
+            totals.append(int(row['stats_total']))
+            weakness.append([multipliers[name] for name in TYPES])
+            masks.append(type_mask(ast.literal_eval(row['types'])))
+
+    columns = {
+        'names': np.array(names, dtype=f"<U{max(len(name) for name in names)}"),
+        'stats': np.array(stats, dtype=COLUMNS['stats']),
+        'stats_total': np.array(totals, dtype=COLUMNS['stats_total']),
+        'weakness': np.array(weakness, dtype=COLUMNS['weakness']),
+        'type_mask': np.array(masks, dtype=COLUMNS['type_mask']),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in columns.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+    # Written last: a dataset without meta.json is treated as missing and rebuilt
+    with open(os.path.join(out_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({'source_sha256': source_hash(csv_path), 'count': len(names), 'types': TYPES, 'stats': STAT_NAMES}, f, indent=2)
+    return len(names)
+
+
+def is_stale(csv_path=SOURCE_CSV, out_dir=DATASET_DIR):
+    """True if the columns are missing or were built from a different version of the CSV."""
+    try:
+        with open(os.path.join(out_dir, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return True
+    return meta.get('source_sha256') != source_hash(csv_path)
+
+
+class PokemonDataset:
+    """Typed, memory-mapped columns of the Pokémon dataset. Row i of every array is the same Pokémon.
+
+    Loading maps the .npy files instead of reading them, so it costs a few
+    milliseconds no matter how the arrays are used afterwards.
+    """
+
+    def __init__(self, out_dir=DATASET_DIR):
+        self.names = np.load(os.path.join(out_dir, "names.npy"), mmap_mode='r')
+        self.stats = np.load(os.path.join(out_dir, "stats.npy"), mmap_mode='r')
+        self.stats_total = np.load(os.path.join(out_dir, "stats_total.npy"), mmap_mode='r')
+        self.weakness = np.load(os.path.join(out_dir, "weakness.npy"), mmap_mode='r')
+        self.type_mask = np.load(os.path.join(out_dir, "type_mask.npy"), mmap_mode='r')
+        self.index = {str(name): i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def indices(self, names):
+        """Row indices for a list of names (KeyError for unknown ones)."""
+        return np.array([self.index[name] for name in names], dtype=np.intp)
+
+    def types_of(self, i):
+        return mask_types(int(self.type_mask[i]))
+
+
+def load_dataset(csv_path=SOURCE_CSV, out_dir=DATASET_DIR):
+    """Returns the PokemonDataset, (re)building the columns first if the CSV changed."""
+    if is_stale(csv_path, out_dir):
+        build_dataset(csv_path, out_dir)
+    return PokemonDataset(out_dir)
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert pokemon_data.csv into typed, memory-mapped columns.")
+    parser.add_argument('--csv', default=SOURCE_CSV)
+    parser.add_argument('--out', default=DATASET_DIR)
+    args = parser.parse_args()
+
+    count = build_dataset(args.csv, args.out)
+    dataset = PokemonDataset(args.out)
+    print(f"Wrote {count} Pokémon to {os.path.abspath(args.out)}")
+    print(f"  stats {dataset.stats.shape} {dataset.stats.dtype}, weakness {dataset.weakness.shape} {dataset.weakness.dtype}, "
+          f"type_mask {dataset.type_mask.shape} {dataset.type_mask.dtype}")
+    example = dataset.index['clodsire']
+    print(f"  clodsire -> row {example}: types {dataset.types_of(example)}, stats {dataset.stats[example].tolist()}")
@@ -0,0 +1,211 @@
+import argparse
+import csv
+import itertools
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from move_index import load_move_index
+from pokemon_dataset import load_dataset
+from team_scoring import DEFAULT_WEIGHTS, TEAM_SIZE, TeamScorer
+
+# --- Configuration ---
+N_POPULATION = 400
+N_GENERATIONS = 150
+CROSSOVER_PER = 0.8 # Share of the population picked as parents each generation
+MUTATION_PER = 0.2 # Chance that an offspring gets one member swapped out
+
+CACHE_SIZE = 200_000 # Teams whose fitness is remembered per run (least recently used are dropped)
+
+WORKERS = os.cpu_count() or 4 # Sweep runs in parallel; a single run scores ~1000 new teams per generation, too few to split
+
+# Weight grid for sweeps, around the values used in results/pokemon_teams.csv
+WEIGHT_GRID = {
+    'stats_weight': [5.0, 10.0],
+    'weaknesses_weight': [-10.0, -5.0],
+    'resistance_weight': [3.0, 7.0],
+    'offensive_coverage_weight': [2.5, 5.0],
+    'stab_power_weight': [0.0, 1.0],
+}
+
+SWEEP_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results", "pokemon_teams_sweep.csv")
+# --- End Configuration ---
+
+# Per-process scorer, built once by init_worker() instead of being pickled with every task
+_SCORER = None
+
+
+def init_worker():
+    global _SCORER
+    _SCORER = TeamScorer(load_dataset())
+
+
+class FitnessCache:
+    """Bounded LRU of team -> fitness for one weight set.
+
+    The elitist selection keeps re-submitting the same teams generation after
+    generation; only teams never seen (or evicted) reach the scorer, and they are
+    scored together in one vectorized batch.
+    """
+
+    def __init__(self, scorer, weights, max_size=CACHE_SIZE):
+        self.scorer = scorer
+        self.weights = weights
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, population):
+        """Fitness of every team in `population` (a list of sorted tuples), as a float array."""
+        missing = list({team for team in population if team not in self.entries})
+        if missing:
+            self.misses += len(missing)
+            scores = self.scorer.score(np.array(missing, dtype=np.intp), self.weights)
+            for team, score in zip(missing, scores.tolist()):
+                self.entries[team] = score
+        self.hits += len(population) - len(missing)
+
+        fitness = np.empty(len(population), dtype=np.float64)
+        for i, team in enumerate(population):
+            self.entries.move_to_end(team)
+            fitness[i] = self.entries[team]
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return fitness
+
+
+def initial_population(n_species, n_population, rng):
+    """Random teams of TEAM_SIZE distinct species, each a sorted tuple of dataset rows."""
+    return [tuple(sorted(rng.choice(n_species, TEAM_SIZE, replace=False).tolist())) for _ in range(n_population)]
+
+
+def fitness_prob(fitness):
+    """Selection probabilities: fitness shifted so the worst team gets 0 (like the TSP GA's max-cost trick)."""
+    shifted = fitness - fitness.min()
+    total = shifted.sum()
+    return shifted / total if total > 0 else np.full(len(fitness), 1 / len(fitness))
+
+
+def roulette_wheel(population, fitness_probs, count, rng):
+    """Draws `count` parents proportionally to fitness in one call."""
+    return [population[i] for i in rng.choice(len(population), size=count, p=fitness_probs)]
+
+
+def crossover(parent_1, parent_2, rng):
+    """Two children that keep the members both parents share and fill up from the rest of either team."""
+    shared = set(parent_1) & set(parent_2)
+    rest = list((set(parent_1) | set(parent_2)) - shared)
+    children = []
+    for _ in range(2):
+        picked = rng.choice(len(rest), TEAM_SIZE - len(shared), replace=False) if rest else []
+        children.append(tuple(sorted(shared | {rest[i] for i in picked})))
+    return children
+
+
+def mutation(team, n_species, rng):
+    """Swaps one random member for a random species not already in the team."""
+    members = set(team)
+    members.discard(team[rng.integers(TEAM_SIZE)])
+    while len(members) < TEAM_SIZE:
+        members.add(int(rng.integers(n_species)))
+    return tuple(sorted(members))
+
+
+def run_ga(scorer, weights, n_population=N_POPULATION, n_generations=N_GENERATIONS, crossover_per=CROSSOVER_PER,
+           mutation_per=MUTATION_PER, seed=None):
+    """Evolves teams for one weight set. Returns (best team, its fitness, the FitnessCache)."""
+    rng = np.random.default_rng(seed)
+    n_species = len(scorer.stats)
+    cache = FitnessCache(scorer, weights)
+
+    population = initial_population(n_species, n_population, rng)
+    for _ in range(n_generations):
+        fitness_probs = fitness_prob(cache.evaluate(population))
+        n_parents = int(crossover_per * n_population) // 2 * 2
+        parents_list = roulette_wheel(population, fitness_probs, n_parents, rng)
+
+        offspring_list = []
+        for i in range(0, len(parents_list), 2):
+            for child in crossover(parents_list[i], parents_list[i + 1], rng):
+                if rng.random() < mutation_per:
+                    child = mutation(child, n_species, rng)
+                offspring_list.append(child)
+
+        # Elitism: the best of parents + offspring + current population survive (duplicates kept once)
+        mixed_offspring = list(dict.fromkeys(population + parents_list + offspring_list))
+        mixed_fitness = cache.evaluate(mixed_offspring)
+        best = np.argsort(mixed_fitness)[::-1][:n_population]
+        population = [mixed_offspring[i] for i in best]
+
+    fitness = cache.evaluate(population)
+    best = int(np.argmax(fitness))
+    return population[best], float(fitness[best]), cache
+
+
+def weight_grid(grid=WEIGHT_GRID):
+    """Every combination of the grid's values, as weight dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def sweep_run(weights, n_population, n_generations, seed):
+    """One GA run inside a pool worker. Returns a result row for the sweep CSV."""
+    team, fitness, cache = run_ga(_SCORER, weights, n_population, n_generations, seed=seed)
+    teams = np.array([team], dtype=np.intp)
+    components = _SCORER.components(teams)
+    power, safety = TeamScorer.percentages(components)
+    return {'team': list(team), 'fitness': fitness, **weights, 'power_percentage': int(power[0]),
+            'safety_percentage': int(safety[0]), 'cache_hits': cache.hits, 'cache_misses': cache.misses}
+
+
+def sweep(grid=WEIGHT_GRID, n_population=N_POPULATION, n_generations=N_GENERATIONS, workers=WORKERS, seed=0):
+    """Runs the GA once per weight combination, the runs spread over a process pool."""
+    load_move_index(load_dataset()) # Build the columns and the move index once here, so workers don't race to rebuild them
+    weight_sets = weight_grid(grid)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(sweep_run, weights, n_population, n_generations, seed + i) for i, weights in enumerate(weight_sets)]
+        return [future.result() for future in futures]
+
+
+def write_results(rows, names, path=SWEEP_CSV):
+    """Writes rows in the layout of results/pokemon_teams.csv (';'-separated, team as a list of names)."""
+    columns = ['team', *DEFAULT_WEIGHTS, 'power_percentage', 'safety_percentage']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(columns)
+        for row in rows:
+            team_names = [str(names[i]) for i in row['team']]
+            writer.writerow([team_names] + [row[column] for column in columns[1:]])
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search Pokémon teams with a genetic algorithm, optionally over a weight grid.")
+    parser.add_argument('--population', type=int, default=N_POPULATION)
+    parser.add_argument('--generations', type=int, default=N_GENERATIONS)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--single', action='store_true', help="One run with DEFAULT_WEIGHTS instead of the WEIGHT_GRID sweep")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=SWEEP_CSV)
+    args = parser.parse_args()
+
+    dataset = load_dataset()
+    start = time.perf_counter()
+    if args.single:
+        team, fitness, cache = run_ga(TeamScorer(dataset), DEFAULT_WEIGHTS, args.population, args.generations, seed=args.seed)
+        print(f"Best team: {[str(dataset.names[i]) for i in team]} (fitness {fitness:.3f})")
+        print(f"Fitness cache: {cache.hits} hits, {cache.misses} teams scored")
+    else:
+        rows = sweep(WEIGHT_GRID, args.population, args.generations, args.workers, args.seed)
+        write_results(rows, dataset.names, args.out)
+        for row in sorted(rows, key=lambda row: row['fitness'], reverse=True)[:5]:
+            print(f"  {[str(dataset.names[i]) for i in row['team']]}: fitness {row['fitness']:.2f}, "
+                  f"power {row['power_percentage']}%, safety {row['safety_percentage']}%")
+        hits = sum(row['cache_hits'] for row in rows)
+        misses = sum(row['cache_misses'] for row in rows)
+        print(f"{len(rows)} weight sets written to {args.out}; fitness cache hit rate {hits / (hits + misses):.0%}")
+    print(f"Finished in {time.perf_counter() - start:.1f}s")
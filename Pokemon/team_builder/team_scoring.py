@@ -0,0 +1,172 @@
+import argparse
+import ast
+import csv
+import os
+import time
+
+import numpy as np
+
+from move_index import load_move_index
+from pokemon_dataset import TYPE_INDEX, TYPES, load_dataset
+
+# --- Configuration ---
+TEAMS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results", "pokemon_teams.csv")
+
+TEAM_SIZE = 6
+
+# Same names as the columns of results/pokemon_teams.csv; weaknesses are a penalty
+DEFAULT_WEIGHTS = {
+    'stats_weight': 10.0,
+    'weaknesses_weight': -10.0,
+    'resistance_weight': 7.0,
+    'offensive_coverage_weight': 5.0,
+    'stab_power_weight': 1.0,
+}
+
+BATCH_SIZE = 65536 # Teams scored per vectorized block; bounds the K x 6 x 18 temporaries to a few MB
+# --- End Configuration ---
+
+# Which component each weight multiplies
+WEIGHT_COMPONENTS = {
+    'stats_weight': 'stats',
+    'weaknesses_weight': 'weaknesses',
+    'resistance_weight': 'resistance',
+    'offensive_coverage_weight': 'offensive_coverage',
+    'stab_power_weight': 'stab_power',
+}
+
+
+def type_chart(dataset):
+    """18 x 18 attack effectiveness chart, chart[attacking, defending], read off single-type Pokémon.
+
+    The CSV's weakness dict holds the multipliers of a Pokémon's own types when attacking
+    (charmander: grass 2, water 0.5), so a single-type row of type t is exactly chart[t, :].
+    """
+    chart = np.ones((len(TYPES), len(TYPES)), dtype=np.float32)
+    type_mask = np.asarray(dataset.type_mask)
+    for attacking in range(len(TYPES)):
+        rows = np.flatnonzero(type_mask == 1 << attacking)
+        if len(rows):
+            chart[attacking, :] = dataset.weakness[rows[0]]
+    # Known matchups; these fail if the chart comes out transposed
+    assert chart[TYPE_INDEX['electric'], TYPE_INDEX['ground']] == 0
+    assert chart[TYPE_INDEX['ground'], TYPE_INDEX['electric']] == 2
+    assert chart[TYPE_INDEX['fire'], TYPE_INDEX['grass']] == 2
+    assert chart[TYPE_INDEX['ground'], TYPE_INDEX['flying']] == 0
+    return chart
+
+
+def defensive_profile(dataset, chart):
+    """N x 18 damage multipliers taken from each attacking type: the product of chart[:, t] over the Pokémon's types."""
+    own_types = (np.asarray(dataset.type_mask, dtype=np.uint32)[:, None] >> np.arange(len(TYPES), dtype=np.uint32)) & 1
+    # N x attacking x defending, with the columns of types the Pokémon doesn't have set to 1
+    return np.where(own_types[:, None, :] == 1, chart[None, :, :], np.float32(1)).prod(axis=2)
+
+
+def coverage_table(chart):
+    """Fraction of the 18 defending types hit super-effectively, for every possible 18-bit type mask.
+
+    2^18 entries (1 MB as float32): a team's coverage is then one lookup of the OR of its members' masks.
+    """
+    super_effective = [(chart[attacking] > 1).astype(np.uint32) @ (1 << np.arange(len(TYPES), dtype=np.uint32))
+                       for attacking in range(len(TYPES))]
+    masks = np.arange(1 << len(TYPES), dtype=np.uint32)
+    covered = np.zeros_like(masks)
+    for attacking, targets in enumerate(super_effective):
+        covered |= np.where(masks >> attacking & 1, np.uint32(targets), np.uint32(0))
+    counts = np.zeros(len(masks), dtype=np.float32)
+    for bit in range(len(TYPES)):
+        counts += covered >> bit & 1
+    return counts / len(TYPES)
+
+
+class TeamScorer:
+    """Scores K candidate teams at once from a K x 6 array of dataset row indices.
+
+    Components (each 0..1, higher is better except weaknesses):
+      stats               mean stats_total of the members, over the dataset maximum
+      weaknesses          share of attacking types more members are weak to (>1x) than resist (<1x)
+      resistance          share of attacking types at least one member resists or is immune to
+      offensive_coverage  share of defending types hit super-effectively by a member's own type (STAB)
+      stab_power          mean best STAB move power of the members, over the dataset maximum
+    """
+
+    def __init__(self, dataset, stab_power=None):
+        chart = type_chart(dataset)
+        damage_taken = defensive_profile(dataset, chart)
+        self.weak = (damage_taken > 1).astype(np.int8)
+        self.resist = (damage_taken < 1).astype(np.int8)
+        self.type_mask = np.asarray(dataset.type_mask, dtype=np.uint32)
+        stats_total = np.asarray(dataset.stats_total, dtype=np.float32)
+        self.stats = stats_total / stats_total.max()
+        stab_power = load_move_index(dataset).stab_power(dataset) if stab_power is None else stab_power
+        stab_power = np.asarray(stab_power, dtype=np.float32)
+        self.stab_power = stab_power / max(stab_power.max(), 1)
+        self.coverage = coverage_table(chart)
+
+    def components(self, teams):
+        """Dict of component name -> (K,) float32 array."""
+        teams = np.asarray(teams, dtype=np.intp).reshape(-1, TEAM_SIZE)
+        parts = [self._components_block(teams[start:start + BATCH_SIZE]) for start in range(0, len(teams), BATCH_SIZE)]
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]} if parts else {}
+
+    def _components_block(self, teams):
+        weak_count = self.weak[teams].sum(axis=1, dtype=np.int8) # K x 18
+        resist_count = self.resist[teams].sum(axis=1, dtype=np.int8)
+        team_mask = np.bitwise_or.reduce(self.type_mask[teams], axis=1)
+        return {
+            'stats': self.stats[teams].mean(axis=1),
+            'weaknesses': (weak_count > resist_count).mean(axis=1, dtype=np.float32),
+            'resistance': (resist_count > 0).mean(axis=1, dtype=np.float32),
+            'offensive_coverage': self.coverage[team_mask],
+            'stab_power': self.stab_power[teams].mean(axis=1),
+        }
+
+    def score(self, teams, weights=None, components=None):
+        """Weighted sum of the components for every team, (K,) float32."""
+        weights = weights or DEFAULT_WEIGHTS
+        components = components if components is not None else self.components(teams)
+        return sum(np.float32(weights[name]) * components[component] for name, component in WEIGHT_COMPONENTS.items())
+
+    @staticmethod
+    def percentages(components):
+        """(power_percentage, safety_percentage) as integer arrays, like the columns in pokemon_teams.csv."""
+        power = (components['stats'] + components['offensive_coverage'] + components['stab_power']) / 3
+        safety = (components['resistance'] + 1 - components['weaknesses']) / 2
+        return np.rint(power * 100).astype(np.int16), np.rint(safety * 100).astype(np.int16)
+
+
+def load_team_results(path=TEAMS_CSV):
+    """Rows of pokemon_teams.csv (';'-separated, team as a stringified list)."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f, delimiter=';'))
+    for row in rows:
+        row['team'] = ast.literal_eval(row['team'])
+    return rows
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score Pokémon teams in vectorized batches.")
+    parser.add_argument('--bench', type=int, default=200_000, help="Random teams to time the scorer on (0 to skip)")
+    args = parser.parse_args()
+
+    dataset = load_dataset()
+    scorer = TeamScorer(dataset)
+
+    print("Teams from results/pokemon_teams.csv, rescored with their own weights:")
+    for row in load_team_results():
+        weights = {name: float(row[name]) for name in DEFAULT_WEIGHTS}
+        teams = dataset.indices(row['team'])[None, :]
+        components = scorer.components(teams)
+        power, safety = scorer.percentages(components)
+        print(f"  {row['team']}: score {scorer.score(teams, weights, components)[0]:.2f}, "
+              f"power {power[0]}% (csv {row['power_percentage']}%), safety {safety[0]}% (csv {row['safety_percentage']}%)")
+
+    if args.bench:
+        teams = np.random.default_rng(0).integers(0, len(dataset), size=(args.bench, TEAM_SIZE))
+        scorer.score(teams[:1000]) # Warm-up
+        start = time.perf_counter()
+        scorer.score(teams)
+        elapsed = time.perf_counter() - start
+        print(f"\nScored {args.bench} random teams in {elapsed:.3f}s ({args.bench / elapsed:,.0f} teams/s)")
@@ -0,0 +1,103 @@
+"""Per-page parse time: full BeautifulSoup tree (what the scrapers used to do) vs. html_extract.
+
+Usage:
+    python bench_html_parse.py                  # synthetic pages from fixtures.py
+    python bench_html_parse.py --fixtures DIR   # saved pages: species_*.html, file_*.html,
+                                                # zerochan_list_*.html, zerochan_image_*.html
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_extract # noqa: E402
+import fixtures # noqa: E402
+
+
+# --- Baselines: the full-tree parsing the scrapers did before html_extract ---
+
+def full_file_linked_images(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    images = []
+    for img_tag in soup.select('a > img'):
+        parent_a = img_tag.find_parent('a')
+        if parent_a and '/wiki/File:' in parent_a.get('href', ''):
+            images.append((parent_a['href'], img_tag.get('src'), img_tag.get('alt', '')))
+    return images
+
+
+def full_file_page_image(html):
+    img_tag = BeautifulSoup(html, 'html.parser').select_one('div#file a img')
+    return img_tag.get('src') if img_tag else None
+
+
+def full_zerochan_thumb_links(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return [link.get('href') for link in soup.select('#thumbs > li > a:first-of-type')]
+
+
+def full_zerochan_full_image(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    tag = soup.select_one('a[href*="static.zerochan.net"]')
+    return tag.get('href') if tag else None
+
+
+KINDS = {
+    # kind: (saved fixture glob, baseline, targeted extractor)
+    'species': ('species_*.html', full_file_linked_images, html_extract.extract_file_linked_images),
+    'file': ('file_*.html', full_file_page_image, html_extract.extract_file_page_image),
+    'zerochan_list': ('zerochan_list_*.html', full_zerochan_thumb_links, html_extract.extract_zerochan_thumb_links),
+    'zerochan_image': ('zerochan_image_*.html', full_zerochan_full_image, html_extract.extract_zerochan_full_image),
+}
+
+
+def synthetic_pages():
+    return {
+        'species': [fixtures.species_page(name).encode() for name in ('rotom', 'clodsire', 'blaziken')],
+        'file': [fixtures.file_page(f"{i:04d}Rotom.png").encode() for i in range(5)],
+        'zerochan_list': [fixtures.zerochan_listing(range(4000000 + i * 100, 4000000 + i * 100 + 96)).encode() for i in range(3)],
+        'zerochan_image': [fixtures.zerochan_image_page(4000000 + i).encode() for i in range(5)],
+    }
+
+
+def saved_pages(fixtures_dir):
+    pages = {}
+    for kind, (pattern, _, _) in KINDS.items():
+        paths = sorted(glob.glob(os.path.join(fixtures_dir, pattern)))
+        if paths:
+            pages[kind] = [open(path, 'rb').read() for path in paths]
+    return pages
+
+
+def time_per_page(function, pages, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for html in pages:
+            function(html)
+    return (time.perf_counter() - start) / (repeats * len(pages))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help="Directory of saved HTML pages (default: synthetic pages)")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    pages_by_kind = saved_pages(args.fixtures) if args.fixtures else synthetic_pages()
+    print(f"Targeted parser: {html_extract.PARSER}")
+    print(f"{'page kind':<16}{'pages':>6}{'avg KB':>9}{'full tree ms':>14}{'targeted ms':>13}{'speedup':>9}")
+
+    for kind, pages in pages_by_kind.items():
+        _, baseline, targeted = KINDS[kind]
+        # Both ways must find the same things, or the timing comparison is meaningless
+        for html in pages:
+            assert baseline(html) == targeted(html), f"{kind}: targeted extraction disagrees with the full parse"
+        full_time = time_per_page(baseline, pages, args.repeats)
+        targeted_time = time_per_page(targeted, pages, args.repeats)
+        avg_kb = sum(len(html) for html in pages) / len(pages) / 1024
+        print(f"{kind:<16}{len(pages):>6}{avg_kb:>9.0f}{full_time * 1000:>14.2f}{targeted_time * 1000:>13.2f}{full_time / targeted_time:>8.1f}x")
@@ -0,0 +1,143 @@
+"""End-to-end scraper benchmark against the local stand-in server (no network needed).
+
+Each run points both scrapers at a fresh StandInServer and a fresh temporary output
+directory, scrapes the same species through Bulbapedia, Zerochan and Danbooru, and
+reports wall time, requests, images/s and the faults the server injected. The 'rerun'
+scenario scrapes everything twice into the same directory and reports the second
+run: pages revalidated as 304s, known URLs linked without a download.
+
+Usage:
+    python bench_scrapers.py                                  # every scenario, concurrency 1 and 8
+    python bench_scrapers.py --scenario throttled --concurrency 4 8 16
+    python bench_scrapers.py --json results.json              # also save the numbers
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bulbapedia_scraper # noqa: E402
+import danbooru_scraper # noqa: E402
+from dedup_index import DedupIndex # noqa: E402
+from download_engine import AsyncDownloader, HostRateLimiter # noqa: E402
+from http_client import POOL_SIZE, HttpClient # noqa: E402
+from near_duplicates import NearDuplicateFilter # noqa: E402
+from request_trace import RequestTrace # noqa: E402
+from standin_server import StandInAdapter, StandInConfig, StandInServer # noqa: E402
+from sync_state import SyncState # noqa: E402
+
+SCENARIOS = {
+    # name: StandInConfig keyword arguments, plus 'runs' (scrapes into the same directory; the last one is reported)
+    'fast': {},
+    'latency': {'latency': 0.05},
+    'throttled': {'latency': 0.02, 'throttle_rate': 0.05},
+    'truncated': {'latency': 0.02, 'truncate_rate': 0.1},
+    'rerun': {'latency': 0.02, 'runs': 2},
+}
+
+SPECIES = ['clodsire', 'obstagoon', 'rotom-mow']
+
+
+def configure(module, out_dir, server, request_delay, concurrency):
+    """Replaces a scraper module's client, downloader and stores with fresh ones aimed at `server`."""
+    module.RATE_LIMITER = HostRateLimiter(request_delay)
+    module.TRACE = RequestTrace(os.path.join(out_dir, "_trace", "bench.jsonl"))
+    cache_dir = os.path.join(out_dir, "_http_cache") if module is bulbapedia_scraper else None
+    module.CLIENT = HttpClient(module.HEADERS, module.RATE_LIMITER, cache_dir=cache_dir, trace=module.TRACE)
+    adapter = StandInAdapter(server.base_url, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    module.CLIENT.session.mount('http://', adapter)
+    module.CLIENT.session.mount('https://', adapter)
+    module.DOWNLOADER = AsyncDownloader(module.CLIENT, max_concurrency=concurrency, partial_dir=os.path.join(out_dir, "_partial"))
+    module.DEDUP = DedupIndex(os.path.join(out_dir, "dedup_index.sqlite"), os.path.join(out_dir, "_store"))
+    module.NEAR_DUPES = NearDuplicateFilter(os.path.join(out_dir, "dedup_index.sqlite"))
+    module.SYNC_STATE = SyncState(os.path.join(out_dir, "sync_state.json"))
+    if module is bulbapedia_scraper:
+        module.downloaded_image_urls = set()
+
+
+def run_scrapers(out_dir, species):
+    """The scrapers' own per-species work, with their console output silenced."""
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        for pokemon in species:
+            save_dir = os.path.join(out_dir, 'bulbapedia', bulbapedia_scraper.sanitize_filename(pokemon))
+            os.makedirs(save_dir, exist_ok=True)
+            bulbapedia_scraper.scrape_bulbapedia(pokemon, save_dir)
+            bulbapedia_scraper.scrape_zerochan(pokemon, save_dir)
+
+            tag = danbooru_scraper.booru_tag(pokemon)
+            tag_dir = os.path.join(out_dir, 'danbooru', tag)
+            os.makedirs(tag_dir, exist_ok=True)
+            danbooru_scraper.download_booru_tag(tag, danbooru_scraper.MAX_IMAGES_PER_POKEMON, tag_dir)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def near_duplicates_skipped(module):
+    """Images the module's scraper rejected as near-duplicates (or replaced by a larger copy)."""
+    with sqlite3.connect(module.DEDUP.db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM rejected").fetchone()[0]
+
+
+def bench(scenario, concurrency, request_delay, species):
+    config = dict(SCENARIOS[scenario])
+    runs = config.pop('runs', 1)
+    server = StandInServer(0, StandInConfig(**config))
+    server.start_background()
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            for module in (bulbapedia_scraper, danbooru_scraper):
+                configure(module, os.path.join(out_dir, module.__name__), server, request_delay, concurrency)
+            for _ in range(runs):
+                bulbapedia_scraper.downloaded_image_urls = set() # Per run, as in a fresh process
+                images_before = bulbapedia_scraper.TRACE.images + danbooru_scraper.TRACE.images
+                server.reset_counts()
+                start = time.perf_counter()
+                run_scrapers(out_dir, species)
+                wall = time.perf_counter() - start
+            images = bulbapedia_scraper.TRACE.images + danbooru_scraper.TRACE.images - images_before
+            near_dupes = sum(near_duplicates_skipped(module) for module in (bulbapedia_scraper, danbooru_scraper))
+            for module in (bulbapedia_scraper, danbooru_scraper):
+                module.DEDUP.close()
+                module.NEAR_DUPES.close()
+                module.TRACE.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    counts = server.counts
+    return {'scenario': scenario, 'concurrency': concurrency, 'request_delay': request_delay,
+            'wall': wall, 'requests': counts['requests'], 'images': images, 'images_per_s': images / wall,
+            'mb_served': counts['bytes'] / 1e6, 'throttled': counts['throttled'], 'truncated': counts['truncated'],
+            'not_modified': counts['not_modified'], 'near_duplicates': near_dupes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--delay', type=float, default=0.01, help="Starting seconds between requests per host (REQUEST_DELAY)")
+    parser.add_argument('--species', nargs='+', default=SPECIES)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<11}{'conc':>5}{'wall s':>9}{'requests':>10}{'images':>8}{'images/s':>10}{'MB':>7}{'429s':>6}{'cut':>5}"
+          f"{'304s':>6}{'near-dup':>9}")
+    results = []
+    for scenario in args.scenario:
+        for concurrency in args.concurrency:
+            result = bench(scenario, concurrency, args.delay, args.species)
+            results.append(result)
+            print(f"{scenario:<11}{concurrency:>5}{result['wall']:>9.2f}{result['requests']:>10}{result['images']:>8}"
+                  f"{result['images_per_s']:>10.1f}{result['mb_served']:>7.1f}{result['throttled']:>6}{result['truncated']:>5}"
+                  f"{result['not_modified']:>6}{result['near_duplicates']:>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
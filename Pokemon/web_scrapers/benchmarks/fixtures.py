@@ -0,0 +1,86 @@
+"""Synthetic stand-ins for the pages the scrapers read.
+
+The structure mirrors the real sites closely enough for the scrapers' selectors
+(species page <a><img> links to /wiki/File:, div#file on File: pages, #thumbs on
+Zerochan listings, #large / static.zerochan.net links on Zerochan image pages), and the
+pages carry realistic amounts of unrelated markup so parse timings are meaningful.
+"""
+import hashlib
+import random
+
+ARCHIVE_HOST = "https://archives.bulbagarden.net"
+
+
+def archive_path(filename):
+    """MediaWiki hashed upload path for a file name, e.g. 2/21/<name> (md5 based, like MediaWiki)."""
+    digest = hashlib.md5(filename.encode()).hexdigest()
+    return f"{digest[0]}/{digest[0]}{digest[1]}/{filename}"
+
+
+def filler_table(rows, seed):
+    rng = random.Random(seed)
+    cells = []
+    for row in range(rows):
+        cells.append(
+            "<tr>" + "".join(
+                f'<td class="c{col}" style="background:#{rng.randrange(0xffffff):06x}">'
+                f'<a href="/wiki/Move_{row}_{col}" title="Move {row}">Move {row}-{col}</a> '
+                f'<span class="note">{rng.randrange(1000)}</span></td>'
+                for col in range(6)
+            ) + "</tr>"
+        )
+    return '<table class="roundy">' + "".join(cells) + "</table>"
+
+
+def species_page(name, file_count=60, filler_rows=600, archive_host=ARCHIVE_HOST, thumb_ratio=0.8):
+    """A Bulbapedia species article with `file_count` image links buried in a large page."""
+    rng = random.Random(name)
+    links = []
+    for i in range(file_count):
+        filename = f"{i:04d}{name.capitalize()}-{rng.randrange(10**6)}.png"
+        path = archive_path(filename)
+        if rng.random() < thumb_ratio:
+            src = f"{archive_host}/media/upload/thumb/{path}/250px-{filename}"
+        else:
+            src = f"/images/icons/{filename}" # Not a thumbnail path: needs a lookup
+        links.append(
+            f'<div class="thumb"><a href="/wiki/File:{filename}" class="image">'
+            f'<img alt="{name} artwork {i}" src="{src}" width="250" height="250"></a></div>'
+        )
+    sections = max(10, file_count)
+    body = "".join(
+        f'<h2>Section {i}</h2><p>{"Lorem ipsum dolor sit amet. " * 20}</p>{filler_table(filler_rows // sections, name + str(i))}{links[i] if i < len(links) else ""}'
+        for i in range(sections)
+    )
+    return f"<!DOCTYPE html><html><head><title>{name} (Pokémon)</title></head><body><div id=\"content\">{body}</div></body></html>"
+
+
+def file_page(filename, archive_host=ARCHIVE_HOST, filler_rows=300):
+    """A Bulbapedia File: page with the full-size image in div#file."""
+    path = archive_path(filename)
+    return (
+        "<!DOCTYPE html><html><body>"
+        f'<div id="file"><a href="{archive_host}/media/upload/{path}"><img src="{archive_host}/media/upload/{path}" alt="File:{filename}"></a></div>'
+        f"{filler_table(filler_rows // 6, filename)}"
+        "</body></html>"
+    )
+
+
+def zerochan_listing(entry_ids, filler_rows=200):
+    """A Zerochan tag listing with one #thumbs li per entry id."""
+    items = "".join(
+        f'<li><a href="/{entry_id}" tabindex="1"><img src="https://s1.zerochan.net/x.240.{entry_id}.jpg"></a>'
+        f'<a href="/{entry_id}#fav">fav</a><p>{entry_id}</p></li>'
+        for entry_id in entry_ids
+    )
+    return f"<!DOCTYPE html><html><body><nav>{filler_table(filler_rows // 6, 'nav')}</nav><ul id=\"thumbs\">{items}</ul></body></html>"
+
+
+def zerochan_image_page(entry_id, static_host="https://static.zerochan.net", filler_rows=300):
+    """A Zerochan image page whose full-size link lives inside #large."""
+    return (
+        "<!DOCTYPE html><html><body>"
+        f"<div id=\"sidebar\">{filler_table(filler_rows // 6, str(entry_id))}</div>"
+        f'<div id="large"><a class="preview" href="{static_host}/Pokemon.full.{entry_id}.png"><img src="https://s1.zerochan.net/x.600.{entry_id}.jpg"></a></div>'
+        "</body></html>"
+    )
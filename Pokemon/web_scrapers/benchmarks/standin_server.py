@@ -0,0 +1,277 @@
+"""Local stand-in for every site the scrapers talk to, with injectable latency and faults.
+
+One server answers for all hosts; the host is taken from the Host header, which
+StandInAdapter keeps pointing at the real site while it sends the request to
+localhost. Pages come from fixtures.py and carry ETag / Last-Modified validators,
+so a conditional re-fetch of an unchanged page is answered with a bodiless 304.
+Images are real PNGs, deterministic per URL path (so Danbooru's md5/file_size fields
+can be checked); a share of them are resized renderings of the same artwork, like
+reposts on the real sites, so the near-duplicate filter has work to do. Range requests
+are honoured so truncated transfers can resume.
+
+Usage (standalone, e.g. to poke at it with curl):
+    python standin_server.py --port 8800 --latency 0.05 --throttle-rate 0.05
+"""
+import argparse
+import functools
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures # noqa: E402
+
+ZEROCHAN_PER_PAGE = 24
+NEAR_DUPLICATE_GROUPS = 16 # Shared artworks the near-duplicate share of images is drawn from
+LAST_MODIFIED = "Mon, 06 Jan 2025 12:00:00 GMT" # Fixture pages never change
+
+
+class StandInConfig:
+    """What the stand-in serves and which faults it injects."""
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, truncate_rate=0.0, retry_after=1,
+                 image_side=192, near_duplicate_rate=0.1, species_files=40, zerochan_pages=2, booru_posts=60, seed=0):
+        self.latency = latency # Seconds added before every response
+        self.throttle_rate = throttle_rate # Fraction of requests answered with 429 + Retry-After
+        self.truncate_rate = truncate_rate # Fraction of image bodies cut off half way
+        self.retry_after = retry_after
+        self.image_side = image_side # Pixels per side (~70 KB as PNG); near-duplicates are 50-100% of it
+        self.near_duplicate_rate = near_duplicate_rate # Fraction of image paths showing a shared artwork
+        self.species_files = species_files # /wiki/File: links per species page
+        self.zerochan_pages = zerochan_pages # Non-empty listing pages per search term
+        self.booru_posts = booru_posts # Posts per Danbooru tag
+        self.seed = seed
+
+
+def artwork(key):
+    """8x8 grid of random colours: every rendering of one key has (nearly) the same dHash."""
+    rng = np.random.default_rng(int(hashlib.md5(key.encode()).hexdigest()[:8], 16))
+    return rng.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+
+
+@functools.lru_cache(maxsize=4096)
+def image_body(path, side, near_duplicate_rate=0.0):
+    """PNG for an image path: an artwork scaled up smoothly plus light noise, deterministic per path.
+
+    A `near_duplicate_rate` share of the paths render one of NEAR_DUPLICATE_GROUPS shared
+    artworks at their own smaller size, so those are resized copies of one another.
+    """
+    digest = int(hashlib.md5(path.encode()).hexdigest()[:8], 16)
+    rng = np.random.default_rng(digest)
+    key = path
+    if rng.random() < near_duplicate_rate:
+        key = f"shared-{digest % NEAR_DUPLICATE_GROUPS}"
+        side = int(side * rng.uniform(0.5, 1.0))
+    smooth = np.asarray(Image.fromarray(artwork(key)).resize((side, side), Image.BILINEAR), dtype=np.int16)
+    noisy = np.clip(smooth + rng.integers(-6, 7, smooth.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(noisy).save(buffer, 'PNG', compress_level=1) # Fast to encode; the noise hardly compresses anyway
+    return buffer.getvalue()
+
+
+def first_id(term):
+    """Newest entry / post id for a search term; older ones count down from it."""
+    return 1_000_000 + int(hashlib.md5(term.encode()).hexdigest()[:6], 16)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, config=None):
+        super().__init__(('127.0.0.1', port), StandInHandler)
+        self.config = config or StandInConfig()
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.reset_counts()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset_counts(self):
+        with self.lock:
+            self.counts = {'requests': 0, 'throttled': 0, 'truncated': 0, 'not_modified': 0, 'bytes': 0, 'by_host': {}}
+
+    def roll(self, rate):
+        with self.lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def count(self, host, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.counts[key] += value
+            if 'requests' in increments:
+                self.counts['by_host'][host] = self.counts['by_host'].get(host, 0) + 1
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up on a kept-alive connection is normal; anything else is worth seeing
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def start_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, like the real sites
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server, config = self.server, self.server.config
+        host = self.headers.get('Host', '').lower()
+        url = urlparse(self.path)
+        path, query = unquote(url.path), parse_qs(url.query)
+        server.count(host, requests=1)
+        if config.latency:
+            time.sleep(config.latency)
+        if server.roll(config.throttle_rate):
+            server.count(host, throttled=1)
+            return self.send_body(429, b'Too Many Requests', 'text/plain', {'Retry-After': str(config.retry_after)})
+
+        if host == 'bulbapedia.bulbagarden.net':
+            if path == '/w/api.php':
+                return self.send_json(self.imageinfo(query))
+            if path.startswith('/wiki/File:'):
+                return self.send_html(fixtures.file_page(path[len('/wiki/File:'):]))
+            if path.startswith('/wiki/'):
+                name = path[len('/wiki/'):].split('_(')[0].replace('+', ' ')
+                return self.send_html(fixtures.species_page(name.lower(), file_count=config.species_files))
+        elif host == 'www.zerochan.net':
+            if re.fullmatch(r'/\d+', path):
+                return self.send_html(fixtures.zerochan_image_page(int(path[1:])))
+            page = int(query.get('p', ['1'])[0])
+            newest = first_id(path) - (page - 1) * ZEROCHAN_PER_PAGE
+            entries = range(newest, newest - ZEROCHAN_PER_PAGE, -1) if page <= config.zerochan_pages else []
+            return self.send_html(fixtures.zerochan_listing(entries))
+        elif host == 'danbooru.donmai.us' and path == '/posts.json':
+            return self.send_json(self.booru_posts(query))
+        elif host in ('archives.bulbagarden.net', 'static.zerochan.net', 'cdn.donmai.us'):
+            return self.send_image(path)
+        self.send_body(404, b'Not Found', 'text/plain')
+
+    def imageinfo(self, query):
+        titles = query.get('titles', [''])[0].split('|')
+        pages = []
+        for title in titles:
+            filename = title.split(':', 1)[1]
+            url = f"{fixtures.ARCHIVE_HOST}/media/upload/{fixtures.archive_path(filename)}"
+            pages.append({'title': title, 'imageinfo': [{'url': url}]})
+        return {'query': {'pages': pages}}
+
+    def booru_posts(self, query):
+        tag = query.get('tags', [''])[0].split()[0]
+        limit = int(query.get('limit', ['20'])[0])
+        newest = first_id(tag)
+        oldest = newest - self.server.config.booru_posts + 1
+        page = query.get('page', [''])[0]
+        start = int(page[1:]) - 1 if page.startswith('b') else newest
+        posts = []
+        for post_id in range(start, max(start - limit, oldest - 1), -1):
+            path = f"/original/{post_id}.png"
+            body = self.image(path)
+            posts.append({'id': post_id, 'file_url': f"https://cdn.donmai.us{path}", 'file_ext': 'png',
+                          'file_size': len(body), 'md5': hashlib.md5(body).hexdigest()})
+        return posts
+
+    def image(self, path):
+        return image_body(path, self.server.config.image_side, self.server.config.near_duplicate_rate)
+
+    def send_image(self, path):
+        body = self.image(path)
+        start = 0
+        match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            if start >= len(body):
+                return self.send_body(416, b'', 'text/plain', {'Content-Range': f"bytes */{len(body)}"})
+        status = 206 if match else 200
+        extra = {'Content-Range': f"bytes {start}-{len(body) - 1}/{len(body)}"} if match else {}
+        chunk = body[start:]
+
+        if self.server.roll(self.server.config.truncate_rate):
+            # Promise the whole body, send half of it, then drop the connection
+            self.server.count(self.headers.get('Host', '').lower(), truncated=1)
+            self.send_response(status)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(chunk)))
+            for name, value in extra.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(chunk[:len(chunk) // 2])
+            self.close_connection = True
+            return
+        self.send_body(status, chunk, 'image/png', extra)
+
+    def send_html(self, html):
+        self.send_cacheable(html.encode(), 'text/html; charset=utf-8')
+
+    def send_json(self, data):
+        self.send_cacheable(json.dumps(data).encode(), 'application/json')
+
+    def send_cacheable(self, body, content_type):
+        """200 with ETag / Last-Modified, or a bodiless 304 if the request's validator still matches."""
+        validators = {'ETag': f'"{hashlib.md5(body).hexdigest()}"', 'Last-Modified': LAST_MODIFIED}
+        if_none_match = self.headers.get('If-None-Match')
+        if (if_none_match == validators['ETag']
+                or (if_none_match is None and self.headers.get('If-Modified-Since') == LAST_MODIFIED)):
+            self.server.count(self.headers.get('Host', '').lower(), not_modified=1)
+            self.send_response(304)
+            for name, value in validators.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self.send_body(200, body, content_type, validators)
+
+    def send_body(self, status, body, content_type, extra_headers=None):
+        self.server.count(self.headers.get('Host', '').lower(), bytes=len(body))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInAdapter(HTTPAdapter):
+    """Sends every request to the stand-in server, keeping the real host in the Host header."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        parsed = urlparse(request.url)
+        request.headers['Host'] = parsed.netloc
+        request.url = self.base_url + (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        return super().send(request, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--truncate-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, StandInConfig(args.latency, args.throttle_rate, args.truncate_rate))
+    print(f"Stand-in server on {server.base_url} (send the real host in the Host header)")
+    server.serve_forever()
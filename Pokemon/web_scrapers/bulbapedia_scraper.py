@@ -1,10 +1,21 @@
 import requests
-from bs4 import BeautifulSoup
+import asyncio
 import os
-import time
 import re
-from urllib.parse import urljoin, quote_plus, urlparse
+import argparse
+from urllib.parse import urljoin, quote_plus, urlparse, urlencode, unquote
 import hashlib # For unique filenames based on URL
+import time
+
+from download_engine import AsyncDownloader, HostRateLimiter
+from http_client import HttpClient
+from html_extract import (extract_file_linked_images, extract_file_page_image,
+                          extract_zerochan_thumb_links, extract_zerochan_full_image)
+from dedup_index import DedupIndex
+from near_duplicates import NearDuplicateFilter, store_unique
+from sync_state import SyncState, capped_mark
+from request_trace import RequestTrace
+from species_names import BULBAPEDIA_DIR, dedup_paths
 
 # --- Configuration ---
 POKEMON_LIST = [
@@ -17,7 +28,7 @@ POKEMON_LIST = [
 ]
 
 # Base directory to save images
-BASE_SAVE_DIR = "/home/atvars/School/advanced_ai/Pokemon/pokemon_pics/web_scrape_2"
+BASE_SAVE_DIR = BULBAPEDIA_DIR # Set in species_names.py, which the image tools read it from too
 
 # Headers to mimic a browser
 HEADERS = {
@@ -27,7 +38,38 @@ HEADERS = {
 # Delay between requests to be polite (in seconds)
 REQUEST_DELAY = 2
 
-# Set to keep track of downloaded image URLs across all sources for a Pokemon
+# One adaptive rate controller per host, shared by page fetches and image downloads.
+# REQUEST_DELAY is the starting pace; each host then speeds up while requests succeed and
+# backs off (honouring Retry-After / X-RateLimit-*) when it answers 429 or 5xx.
+RATE_LIMITER = HostRateLimiter(REQUEST_DELAY)
+
+# One JSON line per request, parse and saved image (host, status, bytes, latency, retries, sleep)
+TRACE = RequestTrace(os.path.join(BASE_SAVE_DIR, "_trace", f"{time.strftime('%Y%m%d-%H%M%S')}.jsonl"))
+
+# One pooled keep-alive session for every page fetch and download. HTML pages are cached on disk
+# and revalidated with ETag / Last-Modified, so unchanged pages come back as bodiless 304s.
+CLIENT = HttpClient(HEADERS, RATE_LIMITER, cache_dir=os.path.join(BASE_SAVE_DIR, "_http_cache"), trace=TRACE)
+
+# Image downloads run concurrently on CLIENT's connections, each host paced by RATE_LIMITER
+DOWNLOADER = AsyncDownloader(CLIENT, partial_dir=os.path.join(BASE_SAVE_DIR, "_partial"))
+
+# MediaWiki API used to resolve many File: titles to their original upload URL at once
+BULBAPEDIA_API_URL = "https://bulbapedia.bulbagarden.net/w/api.php"
+IMAGEINFO_BATCH_SIZE = 50 # Max titles per imageinfo query for anonymous clients
+
+# Persistent index (URL -> content hash -> stored file) so re-runs skip known URLs
+# and identical images are stored once, then linked into each Pokemon's directory
+DEDUP = DedupIndex(*dedup_paths(BASE_SAVE_DIR))
+
+# Perceptual-hash filter: resized/recompressed reposts are rejected before they reach disk
+NEAR_DUPES = NearDuplicateFilter(dedup_paths(BASE_SAVE_DIR)[0])
+
+# Newest Zerochan entry id seen per search term, so `--sync` runs stop paging at known entries
+SYNC_STATE = SyncState(os.path.join(BASE_SAVE_DIR, "sync_state.json"))
+
+# (save_dir, image URL) pairs claimed in this run, across all sources. Keyed by directory so the
+# same image can still land in several Pokemon's folders (e.g. Rotom forms), even when the
+# scrape orchestrator works on several Pokemon at once.
 downloaded_image_urls = set()
 # --- End Configuration ---
 
@@ -69,40 +111,61 @@ def get_image_extension(url, content_type=None):
     # Default if unsure
     return '.jpg'
 
-def download_image(img_url, save_dir, pokemon_name, source_prefix):
-    """Downloads a single image if not already downloaded."""
-    global downloaded_image_urls
-    if img_url in downloaded_image_urls:
+def image_filename(img_url, pokemon_name, source_prefix, extension):
+    """Builds a somewhat unique filename for an image URL."""
+    # Use hash of URL for uniqueness, prefix with source/pokemon
+    url_hash = hashlib.md5(img_url.encode()).hexdigest()[:10]
+    return f"{source_prefix}_{pokemon_name}_{url_hash}{extension}"
+
+async def download_image(img_url, save_dir, pokemon_name, source_prefix, failed=None):
+    """Downloads a single image if not already downloaded. URLs that fail are appended to `failed` (if given)."""
+    claim = (save_dir, img_url)
+    if claim in downloaded_image_urls:
         # print(f"    -> Skipping duplicate: {img_url}")
         return False
+    # Claim the URL now so concurrent tasks in the same batch don't fetch it twice
+    downloaded_image_urls.add(claim)
+
+    if await asyncio.to_thread(DEDUP.is_rejected_url, img_url):
+        return False # Replaced by a larger copy or filtered out in an earlier run
+
+    # Known from an earlier run (or another Pokemon): link the stored copy, no network call
+    stored_path = await asyncio.to_thread(DEDUP.path_for_url, img_url)
+    if stored_path:
+        filename = image_filename(img_url, pokemon_name, source_prefix, os.path.splitext(stored_path)[1])
+        if await asyncio.to_thread(DEDUP.link_into, stored_path, os.path.join(save_dir, filename)):
+            print(f"    -> Linked known image: {filename}")
+            TRACE.image_saved(img_url, 0)
+            return True
+        return False
 
     print(f"    -> Attempting to download: {img_url}")
-    time.sleep(REQUEST_DELAY / 2) # Shorter delay before download attempt
 
     try:
-        response = requests.get(img_url, headers=HEADERS, stream=True, timeout=20)
-        response.raise_for_status() # Raise an exception for bad status codes
+        response_headers, content = await DOWNLOADER.fetch(img_url)
 
         # Check content type
-        content_type = response.headers.get('Content-Type', '').lower()
+        content_type = response_headers.get('Content-Type', '').lower()
         if not content_type or not content_type.startswith('image/'):
             print(f"    -> Skipped non-image content: {img_url} (Type: {content_type})")
             return False
 
-        # Create a somewhat unique filename
-        # Use hash of URL for uniqueness, prefix with source/pokemon
-        url_hash = hashlib.md5(img_url.encode()).hexdigest()[:10]
         extension = get_image_extension(img_url, content_type)
-        filename = f"{source_prefix}_{pokemon_name}_{url_hash}{extension}"
+        filename = image_filename(img_url, pokemon_name, source_prefix, extension)
         filepath = os.path.join(save_dir, filename)
 
-        # Save the image
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(1024 * 8): # Read in chunks
-                f.write(chunk)
+        # Store by content hash and link into save_dir unless a larger copy is already kept (in a worker
+        # thread, overlapping the other transfers); a smaller kept copy is replaced
+        saved, skipped, replaced = await asyncio.to_thread(store_unique, DEDUP, NEAR_DUPES, img_url, content, filepath)
+        if skipped:
+            print(f"    -> Skipped, {skipped}: {img_url}")
+        for path in replaced:
+            print(f"    -> Replaced smaller copy {os.path.basename(path)}")
+        if not saved:
+            return False
 
         print(f"    -> Saved: {filename}")
-        downloaded_image_urls.add(img_url)
+        TRACE.image_saved(img_url, len(content))
         return True
 
     except requests.exceptions.RequestException as e:
@@ -110,12 +173,96 @@ def download_image(img_url, save_dir, pokemon_name, source_prefix):
     except Exception as e:
         print(f"    -> General error processing {img_url}: {e}")
 
+    downloaded_image_urls.discard(claim) # Allow a later retry of a failed URL
+    if failed is not None:
+        failed.append(img_url)
     return False
 
+def download_images(img_urls, save_dir, pokemon_name, source_prefix, failed=None):
+    """Downloads a batch of images concurrently. Returns the number of new images saved."""
+    results = DOWNLOADER.run([download_image(img_url, save_dir, pokemon_name, source_prefix, failed) for img_url in img_urls])
+    return sum(results)
+
+# --- Bulbapedia File: resolution ---
+
+def thumb_to_original(url):
+    """Maps an archives.bulbagarden.net image URL to its original upload, or None if it isn't one.
+
+    Thumbnails live at .../upload/thumb/<a>/<ab>/<Name>/<width>px-<Name>; the original is
+    .../upload/<a>/<ab>/<Name>, so no request is needed to find it.
+    """
+    parsed = urlparse(url)
+    if 'archives.bulbagarden.net' not in parsed.netloc:
+        return None
+    match = re.match(r'^(.*/upload)/thumb/([0-9a-f]/[0-9a-f]{2}/[^/]+)/[^/]+$', parsed.path)
+    if match:
+        return f"{parsed.scheme}://{parsed.netloc}{match.group(1)}/{match.group(2)}"
+    if re.match(r'^.*/upload/[0-9a-f]/[0-9a-f]{2}/[^/]+$', parsed.path):
+        return url # Already the original
+    return None
+
+def file_title_from_url(file_page_url):
+    """Returns the 'File:...' page title from a /wiki/File: URL."""
+    return unquote(urlparse(file_page_url).path.split('/wiki/', 1)[1])
+
+def resolve_file_urls(file_titles):
+    """Resolves many File: titles to original image URLs with batched imageinfo queries.
+
+    Returns {title: url} for the titles the API knew about.
+    """
+    resolved = {}
+    titles = sorted(file_titles)
+    for i in range(0, len(titles), IMAGEINFO_BATCH_SIZE):
+        batch = titles[i:i + IMAGEINFO_BATCH_SIZE]
+        params = {
+            'action': 'query',
+            'titles': '|'.join(batch),
+            'prop': 'imageinfo',
+            'iiprop': 'url',
+            'format': 'json',
+            'formatversion': 2,
+        }
+        api_url = f"{BULBAPEDIA_API_URL}?{urlencode(params)}"
+        response = CLIENT.get_page(api_url, timeout=15, kind='api')
+        with TRACE.timed_parse(api_url):
+            query = response.json().get('query', {})
+        # The API answers with normalized titles (underscores -> spaces); map them back
+        normalized = {entry['to']: entry['from'] for entry in query.get('normalized', [])}
+        for page in query.get('pages', []):
+            image_info = page.get('imageinfo')
+            if image_info and image_info[0].get('url'):
+                resolved[normalized.get(page['title'], page['title'])] = image_info[0]['url']
+    return resolved
+
+def scrape_file_page(file_page_url):
+    """Fallback: reads the full-resolution image URL from a single File: page."""
+    print(f"  Checking file page: {file_page_url}")
+    try:
+        file_page_resp = CLIENT.get_page(file_page_url, timeout=15) # Paced per host and cached inside the client
+        # Find the link to the full image - usually in div#file > a (only that div is parsed)
+        with TRACE.timed_parse(file_page_url):
+            full_img_src = extract_file_page_image(file_page_resp.content)
+        if full_img_src:
+             full_res_url = urljoin(file_page_url, full_img_src)
+             # Check if it looks like a valid image URL from archives
+             if 'archives.bulbagarden.net' in full_res_url:
+                  print(f"    -> Found potential full-res: {full_res_url}")
+                  return full_res_url
+
+    except requests.exceptions.RequestException as e:
+        print(f"    -> Error fetching file page {file_page_url}: {e}")
+    except Exception as e:
+         print(f"    -> Error parsing file page {file_page_url}: {e}")
+    return None
+
 # --- Scraper Functions ---
 
-def scrape_bulbapedia(pokemon_name, save_dir):
-    """Scrapes images from Bulbapedia."""
+def scrape_bulbapedia(pokemon_name, save_dir, raise_errors=False):
+    """Scrapes images from Bulbapedia. Returns the number of new images saved.
+
+    With raise_errors=True a failed species page fetch or parse is re-raised after it is
+    reported, so a caller that tracks jobs (scrape_orchestrator.py) can retry it later.
+    """
     print(f"\n[Bulbapedia] Scraping for '{pokemon_name}'...")
     # Format name for Bulbapedia URL (approximations, might need refinement)
     # Common pattern: Capitalize, replace space/hyphen with underscore, add _(Pokémon)
@@ -138,75 +285,93 @@ def scrape_bulbapedia(pokemon_name, save_dir):
 
     found_count = 0
     try:
-        response = requests.get(base_url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        response = CLIENT.get_page(base_url, timeout=15)
 
-        # Find images - often within <a> tags linking to file pages
-        image_links = soup.select('a > img') # Get images inside links first
+        # Find images - often within <a> tags linking to file pages (only those links are parsed)
+        with TRACE.timed_parse(base_url):
+            image_links = extract_file_linked_images(response.content)
 
         potential_urls = set()
+        file_pages = {} # File: title -> (file page URL, thumbnail URL or None)
 
-        for img_tag in image_links:
-            parent_a = img_tag.find_parent('a')
-            if not parent_a or not parent_a.get('href'):
-                continue
-
-            file_page_url = urljoin(base_url, parent_a['href'])
+        for href, thumb_src, alt_text in image_links:
+            file_page_url = urljoin(base_url, href)
 
             # Only follow links that likely lead to file pages
             if '/wiki/File:' not in file_page_url:
                 continue
 
-            # Extract potential direct image src (usually thumbnails)
-            thumb_src = img_tag.get('src')
+            # Potential direct image src (usually thumbnails)
+            full_thumb_url = None
             if thumb_src:
                  full_thumb_url = urljoin(base_url, thumb_src)
                  # Crude filter: check if pokemon name variations are in alt text or URL
-                 alt_text = img_tag.get('alt', '').lower()
+                 alt_text = alt_text.lower()
                  if any(p in alt_text or p in full_thumb_url.lower() for p in pokemon_name.split('-')):
                      potential_urls.add(full_thumb_url)
 
-
-            # Visit the file page to get the full resolution image
-            print(f"  Checking file page: {file_page_url}")
-            time.sleep(REQUEST_DELAY) # Delay before hitting file page
+            title = file_title_from_url(file_page_url)
+            if title not in file_pages or file_pages[title][1] is None:
+                file_pages[title] = (file_page_url, full_thumb_url)
+
+        # Resolve the full resolution image for every File: link, cheapest way first:
+        # 1. Thumbnail paths rewrite to the original upload path without any request
+        unresolved = {}
+        for title, (file_page_url, thumb_url) in file_pages.items():
+            original_url = thumb_to_original(thumb_url) if thumb_url else None
+            if original_url:
+                potential_urls.add(original_url)
+            else:
+                unresolved[title] = file_page_url
+
+        # 2. The rest in batched imageinfo API queries (up to IMAGEINFO_BATCH_SIZE titles each)
+        if unresolved:
             try:
-                file_page_resp = requests.get(file_page_url, headers=HEADERS, timeout=15)
-                file_page_resp.raise_for_status()
-                file_soup = BeautifulSoup(file_page_resp.content, 'html.parser')
-
-                # Find the link to the full image - usually in div#file > a
-                full_img_link = file_soup.select_one('div#file a img') # Get the img inside the main link
-                if full_img_link and full_img_link.get('src'):
-                     full_res_url = urljoin(file_page_url, full_img_link['src'])
-                     # Check if it looks like a valid image URL from archives
-                     if 'archives.bulbagarden.net' in full_res_url:
-                          potential_urls.add(full_res_url)
-                          print(f"    -> Found potential full-res: {full_res_url}")
+                for title, original_url in resolve_file_urls(unresolved).items():
+                    potential_urls.add(original_url)
+                    unresolved.pop(title, None)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"    -> imageinfo lookup failed, falling back to file pages: {e}")
 
-            except requests.exceptions.RequestException as e:
-                print(f"    -> Error fetching file page {file_page_url}: {e}")
-            except Exception as e:
-                 print(f"    -> Error parsing file page {file_page_url}: {e}")
+        # 3. Only what is still unknown costs a File: page fetch each
+        for file_page_url in unresolved.values():
+            full_res_url = scrape_file_page(file_page_url)
+            if full_res_url:
+                potential_urls.add(full_res_url)
 
+        print(f"  [Bulbapedia] Resolved {len(file_pages)} file links with {len(file_pages) - len(unresolved)} direct/batched lookups and {len(unresolved)} file page fetches.")
 
         print(f"  [Bulbapedia] Found {len(potential_urls)} potential image URLs. Downloading...")
-        for img_url in potential_urls:
-             if download_image(img_url, save_dir, pokemon_name, "bulbapedia"):
-                 found_count += 1
-                 time.sleep(REQUEST_DELAY) # Delay between downloads
+        found_count += download_images(potential_urls, save_dir, pokemon_name, "bulbapedia")
 
 
     except requests.exceptions.RequestException as e:
         print(f"  Error fetching Bulbapedia page for {pokemon_name}: {e}")
+        if raise_errors:
+            raise
     except Exception as e:
         print(f"  Error parsing Bulbapedia page for {pokemon_name}: {e}")
+        if raise_errors:
+            raise
 
     print(f"  [Bulbapedia] Downloaded {found_count} new images for '{pokemon_name}'.")
-
-def scrape_zerochan(pokemon_name, save_dir):
-    """Scrapes images from Zerochan."""
+    return found_count
+
+def zerochan_entry_id(href):
+    """Returns the numeric entry id of a Zerochan image page link like '/4012345', or None."""
+    match = re.match(r'^/(\d+)', href)
+    return int(match.group(1)) if match else None
+
+def scrape_zerochan(pokemon_name, save_dir, sync=False, raise_errors=False):
+    """Scrapes images from Zerochan. Returns the number of new images saved.
+
+    Listings are newest first, so with sync=True paging stops at the first entry at or
+    below the newest one recorded by a previous run. The recorded mark stays below any
+    entry whose image page or download failed, so the next sync retries it, and a sync
+    that stops at max_pages or a failing page before reaching the mark leaves a resume
+    point: the next sync continues from that page. With raise_errors=True a listing
+    page that fails to load or parse is re-raised once the run stops.
+    """
     print(f"\n[Zerochan] Scraping for '{pokemon_name}'...")
     # Format name for Zerochan (usually space/hyphen -> +, Capitalized words)
     # Specific handling needed for forms/mega
@@ -221,100 +386,121 @@ def scrape_zerochan(pokemon_name, save_dir):
     query_params = {'p': 1} # Start with page 1
     found_count = 0
     max_pages = 5 # Limit number of pages to scrape to avoid excessive requests
+    since_id = SYNC_STATE.get('zerochan', search_term) if sync else None
+    resume = SYNC_STATE.get_resume('zerochan', search_term) if sync else None
+    if resume:
+        # New entries only push older ones to later pages, so nothing before this page is missed
+        since_id, query_params['p'] = resume['since'], resume['cursor']
+        print(f"  Resuming the sync from page {query_params['p']}")
+    last_page = query_params['p'] + max_pages - 1
+    newest_id = since_id
+    failed_ids = [] # Entries whose image page or image could not be fetched
+    reached_known = False
+    complete = False # Stopped at known entries or the end of the listing, not at last_page or an error
+    listing_error = None
 
     print(f"  Zerochan Search URL (base): {base_url}")
 
-    while query_params['p'] <= max_pages:
+    while query_params['p'] <= last_page:
         current_url = f"{base_url}?p={query_params['p']}"
         print(f"  Scraping page {query_params['p']}: {current_url}")
 
         try:
-            response = requests.get(current_url, headers=HEADERS, timeout=20)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = CLIENT.get_page(current_url, timeout=20)
 
-            # Find links to individual image pages (usually within #thumbs li > a)
-            image_page_links = soup.select('#thumbs > li > a:first-of-type')
+            # Find links to individual image pages (usually within #thumbs li > a; only #thumbs is parsed)
+            with TRACE.timed_parse(current_url):
+                image_page_links = extract_zerochan_thumb_links(response.content)
 
             if not image_page_links:
                 print(f"  No more image links found on page {query_params['p']}. Stopping.")
+                complete = True
                 break # No images on this page, likely end of results
 
             page_potential_urls = set()
-            for link in image_page_links:
-                href = link.get('href')
+            url_entries = {} # full-res URL -> entry id, to map failed downloads back to their entries
+            for href in image_page_links:
                 if href and not href.startswith(('http:', 'https:')):
+                    entry_id = zerochan_entry_id(href)
+                    if entry_id is not None:
+                        if since_id is not None and entry_id <= since_id:
+                            reached_known = True # Everything from here on was seen by an earlier run
+                            break
+                        newest_id = entry_id if newest_id is None else max(newest_id, entry_id)
                     img_page_url = urljoin(base_url, href)
                     # print(f"    Found image page link: {img_page_url}") # Debugging
 
                     # Now visit the image page to find the full-res link
-                    time.sleep(REQUEST_DELAY) # Delay before hitting image page
                     try:
-                        img_page_resp = requests.get(img_page_url, headers=HEADERS, timeout=15)
-                        img_page_resp.raise_for_status()
-                        img_soup = BeautifulSoup(img_page_resp.content, 'html.parser')
-
-                        # Find the full image link (often #large or specific link)
-                        # Method 1: Look for a direct link with 'static.zerochan.net'
-                        full_img_tag = img_soup.select_one('a[href*="static.zerochan.net"]')
-                        if not full_img_tag:
-                            # Method 2: Look for the main image display if Method 1 fails
-                            full_img_tag = img_soup.select_one('#large') # Often the container
-                            if full_img_tag:
-                                 # Check if 'a' or 'img' inside #large has the src/href
-                                 inner_link = full_img_tag.find('a')
-                                 if inner_link and inner_link.get('href') and 'static.zerochan.net' in inner_link.get('href'):
-                                     full_img_tag = inner_link # Use the inner 'a' tag
-                                 else:
-                                     inner_img = full_img_tag.find('img')
-                                     if inner_img and inner_img.get('src') and 'static.zerochan.net' in inner_img.get('src'):
-                                         full_img_tag = inner_img # Use the inner 'img' tag
-                                     else:
-                                          full_img_tag = None # Reset if no valid link found
-
-
-                        if full_img_tag:
-                            full_res_url = full_img_tag.get('href') or full_img_tag.get('src')
-                            if full_res_url:
-                                page_potential_urls.add(full_res_url)
-                                # print(f"      -> Found potential full-res: {full_res_url}") # Debugging
+                        img_page_resp = CLIENT.get_page(img_page_url, timeout=15) # Paced per host and cached inside the client
+
+                        # Find the full image link: a direct static.zerochan.net link, else inside #large
+                        with TRACE.timed_parse(img_page_url):
+                            full_res_url = extract_zerochan_full_image(img_page_resp.content)
+                        if full_res_url:
+                            page_potential_urls.add(full_res_url)
+                            if entry_id is not None:
+                                url_entries[full_res_url] = entry_id
+                            # print(f"      -> Found potential full-res: {full_res_url}") # Debugging
                         # else:
                             # print(f"      -> Could not find full-res link on {img_page_url}") # Debugging
 
                     except requests.exceptions.RequestException as e:
                         print(f"    -> Error fetching image page {img_page_url}: {e}")
+                        if entry_id is not None:
+                            failed_ids.append(entry_id)
                     except Exception as e:
                          print(f"    -> Error parsing image page {img_page_url}: {e}")
+                         if entry_id is not None:
+                             failed_ids.append(entry_id)
 
 
             print(f"  [Zerochan Page {query_params['p']}] Found {len(page_potential_urls)} potential image URLs. Downloading...")
-            page_download_count = 0
-            for img_url in page_potential_urls:
-                if download_image(img_url, save_dir, pokemon_name, "zerochan"):
-                    found_count += 1
-                    page_download_count +=1
-                    time.sleep(REQUEST_DELAY) # Delay between downloads
+            failed_urls = []
+            page_download_count = download_images(page_potential_urls, save_dir, pokemon_name, "zerochan", failed_urls)
+            failed_ids.extend(url_entries[url] for url in failed_urls if url in url_entries)
+            found_count += page_download_count
 
             print(f"  [Zerochan Page {query_params['p']}] Downloaded {page_download_count} new images.")
 
+            if reached_known:
+                print(f"  Reached already synced entries (id <= {since_id}). Stopping.")
+                complete = True
+                break
+
             # Check for a "next" page link to continue (or just increment page number)
             # Simple pagination: just increment page number. Zerochan often uses ?p=
             query_params['p'] += 1
-            time.sleep(REQUEST_DELAY) # Delay before scraping next page
 
         except requests.exceptions.RequestException as e:
             print(f"  Error fetching Zerochan page {query_params['p']} for {pokemon_name}: {e}")
+            listing_error = e
             break # Stop if a page fetch fails
         except Exception as e:
              print(f"  Error parsing Zerochan page {query_params['p']} for {pokemon_name}: {e}")
+             listing_error = e
              break # Stop if parsing fails
 
 
+    if resume:
+        newest_id = resume['newest'] # Everything this run lists is older than the walk it continues
+    mark = capped_mark(newest_id, failed_ids)
+    if sync:
+        SYNC_STATE.finish_walk('zerochan', search_term, since_id, mark, complete, query_params['p'])
+    else:
+        SYNC_STATE.update('zerochan', search_term, mark) # Full runs set the mark too, for the next sync
     print(f"\n  [Zerochan] Total downloaded {found_count} new images for '{pokemon_name}'.")
+    if listing_error is not None and raise_errors:
+        raise listing_error
+    return found_count
 
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Pokémon images from Bulbapedia and Zerochan.")
+    parser.add_argument('--sync', action='store_true', help="Only fetch Zerochan entries newer than the last run")
+    args = parser.parse_args()
+
     if not os.path.exists(BASE_SAVE_DIR):
         os.makedirs(BASE_SAVE_DIR)
         print(f"Created base directory: {BASE_SAVE_DIR}")
@@ -326,16 +512,12 @@ if __name__ == "__main__":
             os.makedirs(pokemon_save_dir)
             print(f"Created directory for {pokemon}: {pokemon_save_dir}")
 
-        # Reset downloaded list for each Pokemon to allow same image if relevant to multiple searches (e.g. Rotom forms)
-        # If you want images to be unique ACROSS ALL pokemon, move this set outside the loop.
-        downloaded_image_urls = set()
-
         # Call scraper functions for each source
         scrape_bulbapedia(pokemon, pokemon_save_dir)
-        scrape_zerochan(pokemon, pokemon_save_dir)
+        scrape_zerochan(pokemon, pokemon_save_dir, sync=args.sync)
         # Add calls to other scraper functions here if you implement more
 
         print(f"\n{'='*10} Finished processing: {pokemon} {'='*10}")
-        time.sleep(REQUEST_DELAY * 2) # Longer delay between Pokemon
 
-    print("\nScraping complete for all specified Pokémon.")
\ No newline at end of file
+    print("\nScraping complete for all specified Pokémon.")
+    TRACE.summary("Bulbapedia / Zerochan run")
\ No newline at end of file
@@ -1,22 +1,25 @@
 import requests
+import asyncio
 import os
-import time
 import json
+import argparse
+import time
 from urllib.parse import urlparse, quote_plus
 
+from download_engine import AsyncDownloader, HostRateLimiter
+from http_client import HttpClient
+from dedup_index import DedupIndex
+from near_duplicates import NearDuplicateFilter, store_unique
+from sync_state import SyncState, capped_mark
+from request_trace import RequestTrace
+from species_names import DANBOORU_DIR, POKEMON_TAG_MAP, booru_tag, dedup_paths
+
 # --- Configuration ---
-POKEMON_TAG_MAP = {
-    "Clodsire": "clodsire",
-    "Rotom-Mow": "rotom_(mow)",
-    "Rotom-Frost": "rotom_(frost)",
-    "Blaziken-Mega": "mega_blaziken",
-    "Obstagoon": "obstagoon",
-    "Meloetta-Aria": "meloetta_(aria)",
-}
+# The Pokemon to download and their Danbooru tags are listed in species_names.POKEMON_TAG_MAP
 
 MAX_IMAGES_PER_POKEMON = 500 # Adjust as needed, but start reasonably small!
 
-OUTPUT_DIR = "./pokemon_pics/web_scrape"
+OUTPUT_DIR = DANBOORU_DIR # Set in species_names.py, which the image tools read it from too
 
 API_URL = "https://danbooru.donmai.us/posts.json"
 
@@ -24,15 +27,41 @@ SAFETY_FILTER = "-rating:explicit -rating:questionable rating:safe" # Prioritize
 
 REQUEST_DELAY = 1.1
 
+# Only the fields the downloader uses (file_size and md5 verify the transfer); keeps API pages small
+POST_FIELDS = "id,file_url,file_ext,file_size,md5"
+
 # User-Agent
 HEADERS = {
     'User-Agent': 'PokemonDatasetScraper/1.0'
 }
 
+# One adaptive rate controller per host, shared by the API calls and the image downloads.
+# REQUEST_DELAY is the starting pace; each host then speeds up while requests succeed and
+# backs off (honouring Retry-After / X-RateLimit-*) when it answers 429 or 5xx.
+RATE_LIMITER = HostRateLimiter(REQUEST_DELAY)
+
+# One JSON line per request, parse and saved image (host, status, bytes, latency, retries, sleep)
+TRACE = RequestTrace(os.path.join(OUTPUT_DIR, "_trace", f"{time.strftime('%Y%m%d-%H%M%S')}.jsonl"))
+
+# One pooled keep-alive session for the API calls and the image downloads
+CLIENT = HttpClient(HEADERS, RATE_LIMITER, trace=TRACE)
+
+# Image downloads run concurrently on CLIENT's connections, each host paced by RATE_LIMITER
+DOWNLOADER = AsyncDownloader(CLIENT, partial_dir=os.path.join(OUTPUT_DIR, "_partial"))
+
+# Persistent index (URL -> content hash -> stored file) shared by every tag and every run
+DEDUP = DedupIndex(*dedup_paths(OUTPUT_DIR))
+
+# Perceptual-hash filter: resized/recompressed reposts are rejected before they reach disk
+NEAR_DUPES = NearDuplicateFilter(dedup_paths(OUTPUT_DIR)[0])
+
+# Highest post id seen per tag, so `--sync` runs stop paging once they reach known posts
+SYNC_STATE = SyncState(os.path.join(OUTPUT_DIR, "sync_state.json"))
+
 # --- End Configuration ---
 
-def download_image_from_booru(post, output_subdir):
-    """Downloads an image from a Danbooru post dictionary."""
+async def download_image_from_booru(post, output_subdir, failed_ids=None):
+    """Downloads an image from a Danbooru post dictionary. Ids of posts that fail are appended to `failed_ids` (if given)."""
     if 'file_url' not in post or not post['file_url']:
         print(f"  Skipping post ID {post.get('id', 'N/A')} - No file_url found.")
         return False
@@ -57,37 +86,108 @@ def download_image_from_booru(post, output_subdir):
         print(f"  Skipping post ID {post_id} - File already exists: {filename}")
         return False # Indicate already exists, not a failure
 
+    if await asyncio.to_thread(DEDUP.is_rejected_url, image_url):
+        print(f"  Skipping post ID {post_id} - Rejected in an earlier run")
+        return False
+
+    # Same file already fetched for another tag or in an earlier run: link it, no network call
+    stored_path = await asyncio.to_thread(DEDUP.path_for_url, image_url)
+    if stored_path:
+        print(f"  Linking known image for post ID {post_id} -> {filename}")
+        linked = await asyncio.to_thread(DEDUP.link_into, stored_path, filename)
+        if linked:
+            TRACE.image_saved(image_url, 0)
+        return linked
+
     print(f"  Downloading Post ID {post_id} -> {filename}...")
     try:
-        time.sleep(REQUEST_DELAY) # Wait BEFORE downloading image
-        img_response = requests.get(image_url, headers=HEADERS, stream=True, timeout=30)
-        img_response.raise_for_status()
-
-        with open(filename, 'wb') as f:
-            for chunk in img_response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        # Rate limited per host inside the engine; Danbooru tells us the size and MD5 to verify against
+        _, content = await DOWNLOADER.fetch(image_url, expected_size=post.get('file_size'), expected_md5=post.get('md5'))
+        # Stored once by content hash, then linked to {post_id}.{ext}, unless a larger repost is already kept
+        saved, skipped, replaced = await asyncio.to_thread(store_unique, DEDUP, NEAR_DUPES, image_url, content, filename)
+        if skipped:
+            print(f"  Skipping post ID {post_id} - {skipped.capitalize()}")
+        for path in replaced:
+            print(f"  Replaced smaller copy {os.path.basename(path)} with post ID {post_id}")
+        if not saved:
+            return False
+        TRACE.image_saved(image_url, len(content))
         # print(f"  Successfully downloaded {filename}")
         return True # Indicate successful download
 
     except requests.exceptions.RequestException as e:
+        # Nothing to clean up: the final file only appears once a complete, verified body is stored,
+        # and the engine keeps the .part file so the next attempt resumes where this one stopped
         print(f"  Error downloading {image_url} (Post ID {post_id}): {e}")
-        # Optionally remove partially downloaded file
-        if os.path.exists(filename):
-            try:
-                os.remove(filename)
-            except OSError:
-                pass
-        return False
     except Exception as e:
         print(f"  An unexpected error occurred saving image for Post ID {post_id}: {e}")
-        return False
-
-
-def fetch_booru_posts(tag, limit_per_pokemon):
-    """Fetches post data from Danbooru API for a given tag, handling pagination."""
-    posts = []
-    page = 1
-    downloaded_count = 0
+    if failed_ids is not None:
+        failed_ids.append(post_id)
+    return False
+
+
+def download_booru_tag(tag, limit_per_pokemon, output_subdir, sync=False, raise_errors=False):
+    """Streams metadata pages for a tag straight into the download workers.
+
+    The next page is requested while the previous page's images download, so the
+    first image starts after a single API round-trip. With sync=True only posts newer
+    than the tag's stored high-water mark are fetched; the mark stored afterwards stays
+    below any post that failed, so the next sync retries it. A sync that stops before
+    reaching the mark (limit, failed page) leaves a resume point, and the next sync
+    continues below the oldest post it listed. Returns (posts_seen, downloaded).
+    With raise_errors=True, giving up on an API page raises once the downloads finish.
+    """
+    resume = SYNC_STATE.get_resume('danbooru', tag) if sync else None
+    if resume:
+        since_id, before_id = resume['since'], resume['cursor']
+        print(f"  Resuming the sync of '{tag}' below post ID {before_id}")
+    else:
+        since_id, before_id = (SYNC_STATE.get('danbooru', tag) if sync else None), None
+    errors = []
+    walk = {}
+    pages = fetch_booru_posts(tag, limit_per_pokemon, since_id=since_id, errors=errors, before_id=before_id, walk=walk)
+    newest = {'id': since_id}
+    failed_ids = []
+
+    async def handle(post):
+        if 'id' in post and (newest['id'] is None or post['id'] > newest['id']):
+            newest['id'] = post['id']
+        return await download_image_from_booru(post, output_subdir, failed_ids)
+
+    result = DOWNLOADER.run_streaming(pages, handle)
+    if resume:
+        newest['id'] = resume['newest'] # Everything this run lists is older than the walk it continues
+    mark = capped_mark(newest['id'], failed_ids)
+    if sync:
+        SYNC_STATE.finish_walk('danbooru', tag, since_id, mark, walk.get('complete', False), walk.get('oldest'))
+    else:
+        SYNC_STATE.update('danbooru', tag, mark) # Full runs set the mark too, for the next sync
+    if errors and raise_errors:
+        raise requests.exceptions.RequestException(f"Danbooru API gave up on tag '{tag}': {errors[-1]}")
+    return result
+
+
+def fetch_booru_posts(tag, limit_per_pokemon, since_id=None, errors=None, before_id=None, walk=None):
+    """Yields pages of post data from Danbooru API for a given tag, handling pagination.
+
+    Pages are walked with a keyset cursor (page=b<id>: posts with a lower id than the
+    last one seen) rather than page numbers, so every request is a cheap indexed
+    query and big tags can be crawled to the end.
+
+    If since_id is given (sync mode), paging stops at the first post with an id at or
+    below it: results come newest first, so everything after that is already known.
+
+    When it stops because a page kept failing, the reason is appended to `errors` (if given).
+
+    before_id starts the walk below that post (resuming an earlier sync). `walk` (if given)
+    gets 'oldest', the lowest post id handed out, and 'complete', True once paging stopped
+    at since_id or at the end of the listing rather than at the limit or a failing page.
+    """
+    page = 1 # Only used for log messages
+    # before_id is the cursor: lowest post id seen so far
+    walk = {} if walk is None else walk
+    walk['complete'] = False
+    fetched_count = 0
     max_attempts = 5 # Max attempts per page before giving up
     consecutive_failures = 0
 
@@ -95,20 +195,21 @@ def fetch_booru_posts(tag, limit_per_pokemon):
     search_tags = f"{tag} {SAFETY_FILTER}".strip()
     print(f"  Fetching posts for tags: '{search_tags}'")
 
-    session = requests.Session()
-    session.headers.update(HEADERS)
-
-    while downloaded_count < limit_per_pokemon:
+    while fetched_count < limit_per_pokemon:
         print(f"\n  Requesting page {page} for tag '{tag}'...")
         params = {
             'tags': search_tags,
-            'limit': min(200, limit_per_pokemon - downloaded_count), # Request up to 200 (API max) or remaining needed
-            'page': page
+            'limit': min(200, limit_per_pokemon - fetched_count), # Request up to 200 (API max) or remaining needed
+            'only': POST_FIELDS,
         }
+        if before_id is not None:
+            params['page'] = f"b{before_id}"
 
+        throttle_pause = None
         try:
-            time.sleep(REQUEST_DELAY) # Wait BEFORE making API call
-            response = session.get(API_URL, params=params, timeout=20)
+            # The client waits for the API host's slot BEFORE making the call and reports the outcome
+            response = CLIENT.get(API_URL, params=params, timeout=20, kind='api', retries=consecutive_failures)
+            throttle_pause = response.throttle_pause
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
             # Check content type before parsing JSON
@@ -119,21 +220,44 @@ def fetch_booru_posts(tag, limit_per_pokemon):
                  consecutive_failures += 1
                  if consecutive_failures >= max_attempts:
                      print(f"  Too many consecutive errors fetching page {page}. Stopping for tag '{tag}'.")
+                     if errors is not None:
+                         errors.append(f"page {page}: Content-Type {content_type}")
                      break
                  continue # Try next page or break
 
-            page_posts = response.json()
+            with TRACE.timed_parse(API_URL):
+                page_posts = response.json()
             consecutive_failures = 0 # Reset failures on success
 
             if not page_posts:
                 print(f"  No more posts found for tag '{tag}' on page {page}.")
+                walk['complete'] = True
                 break # Exit loop if no more posts are returned
 
-            posts.extend(page_posts)
-            downloaded_count = len(posts) # Update count based on fetched post *metadata*
-            print(f"  Fetched {len(page_posts)} posts on page {page}. Total posts fetched so far: {downloaded_count}")
+            page_ids = [post['id'] for post in page_posts if 'id' in post]
+            if not page_ids or (before_id is not None and min(page_ids) >= before_id):
+                print(f"  Cursor did not advance on page {page} for tag '{tag}'. Stopping.")
+                break
+            before_id = min(page_ids)
+
+            reached_known = False
+            if since_id is not None:
+                new_posts = [post for post in page_posts if post.get('id', 0) > since_id]
+                reached_known = len(new_posts) < len(page_posts)
+                page_posts = new_posts
+
+            page_posts = page_posts[:limit_per_pokemon - fetched_count] # Never hand out more than the requested limit
+            fetched_count += len(page_posts) # Update count based on fetched post *metadata*
+            walk['oldest'] = min((post['id'] for post in page_posts if 'id' in post), default=walk.get('oldest'))
+            print(f"  Fetched {len(page_posts)} posts on page {page}. Total posts fetched so far: {fetched_count}")
+            yield page_posts # Hand the page to the downloaders before fetching the next one
+
+            if reached_known:
+                print(f"  Reached already synced posts (id <= {since_id}) for tag '{tag}'. Stopping.")
+                walk['complete'] = True
+                break
 
-            page += 1 # Go to the next page for the next iteration
+            page += 1 # The next iteration continues below before_id
 
             # Optional: Break if fewer posts were returned than requested limit (likely end of results)
             if len(page_posts) < params['limit'] and params['limit'] == 200:
@@ -146,11 +270,14 @@ def fetch_booru_posts(tag, limit_per_pokemon):
              print(f"  HTTP Error fetching page {page} for tag '{tag}': {e.response.status_code} {e.response.reason}")
              print(f"  Response text (first 500 chars): {e.response.text[:500]}")
              consecutive_failures += 1
-             if e.response.status_code == 429: # Too Many Requests
-                 print("  Rate limit hit (429)! Increasing delay and retrying after a pause...")
-                 time.sleep(10) # Longer pause after a 429
-             elif consecutive_failures >= max_attempts:
+             if throttle_pause is not None:
+                 # The controller has already cut the rate and paused the host (Retry-After or backoff)
+                 print(f"  Throttled ({e.response.status_code})! Slowing down and retrying in {throttle_pause:.1f}s...")
+             # Too Many Requests (429) keeps retrying at the slower pace; other errors give up eventually
+             if e.response.status_code != 429 and consecutive_failures >= max_attempts:
                  print(f"  Too many consecutive HTTP errors fetching page {page}. Stopping for tag '{tag}'.")
+                 if errors is not None:
+                     errors.append(f"page {page}: HTTP {e.response.status_code}")
                  break
              # Don't increment page on failure, retry same page (implicitly by continuing loop)
              continue
@@ -160,9 +287,10 @@ def fetch_booru_posts(tag, limit_per_pokemon):
             consecutive_failures += 1
             if consecutive_failures >= max_attempts:
                 print(f"  Too many consecutive network errors fetching page {page}. Stopping for tag '{tag}'.")
+                if errors is not None:
+                    errors.append(f"page {page}: {e}")
                 break
-            time.sleep(5) # Wait a bit longer after network errors
-            continue # Retry same page
+            continue # Retry same page (the client has already backed the host off)
 
         except json.JSONDecodeError as e:
             print(f"  Error decoding JSON response from page {page} for tag '{tag}': {e}")
@@ -170,28 +298,28 @@ def fetch_booru_posts(tag, limit_per_pokemon):
             consecutive_failures += 1
             if consecutive_failures >= max_attempts:
                 print(f"  Too many consecutive JSON errors fetching page {page}. Stopping for tag '{tag}'.")
+                if errors is not None:
+                    errors.append(f"page {page}: {e}")
                 break
             continue # Try next page or break
 
-        # Safety break if something causes an infinite loop (e.g., API always returning data)
-        if page > (limit_per_pokemon // 100) + 50: # Heuristic page limit
-             print(f"  Warning: Reached page limit heuristic ({page}). Stopping fetch for tag '{tag}' to prevent potential infinite loop.")
-             break
 
-
-    print(f"\nFinished fetching metadata for tag '{tag}'. Total posts found: {len(posts)}")
-    # Return only up to the requested limit, even if more metadata was fetched
-    return posts[:limit_per_pokemon]
+    print(f"\nFinished fetching metadata for tag '{tag}'. Total posts found: {fetched_count}")
 
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download Pokémon images from Danbooru.")
+    parser.add_argument('--sync', action='store_true', help="Only fetch posts newer than the last run for each tag")
+    args = parser.parse_args()
+
     print("Starting Pokémon Image Downloader...")
     print(f"--- Using Source: {API_URL} ---")
     print(f"--- Max Images Per Pokémon: {MAX_IMAGES_PER_POKEMON} ---")
     print(f"--- Safety Filter: '{SAFETY_FILTER}' ---")
     print(f"--- Request Delay: {REQUEST_DELAY}s ---")
     print(f"--- Output Directory: {OUTPUT_DIR} ---")
+    print(f"--- Mode: {'sync (new posts only)' if args.sync else 'full crawl'} ---")
     print("\n!! WARNING: THIS CAN DOWNLOAD LARGE AMOUNTS OF DATA !!")
     print("!! WARNING: REVIEW DOWNLOADED IMAGES CAREFULLY FOR CONTENT !!")
     print("!! WARNING: ENSURE TAGS IN POKEMON_TAG_MAP ARE CORRECT FOR DANBOORU !!\n")
@@ -211,19 +339,9 @@ if __name__ == "__main__":
         os.makedirs(pokemon_dir, exist_ok=True)
         print(f"  Output subdirectory: {pokemon_dir}")
 
-        # 1. Fetch all post metadata first
-        posts_to_download = fetch_booru_posts(tag, MAX_IMAGES_PER_POKEMON)
-        num_posts_found = len(posts_to_download)
+        # Metadata pages are streamed into the downloaders as they arrive (concurrently, rate limited per host)
+        num_posts_found, current_pokemon_downloaded = download_booru_tag(tag, MAX_IMAGES_PER_POKEMON, pokemon_dir, sync=args.sync)
         total_attempted += num_posts_found
-        print(f"\nFound {num_posts_found} potential images for tag '{tag}'. Starting downloads...")
-
-        # 2. Download the images for the fetched posts
-        current_pokemon_downloaded = 0
-        for i, post_data in enumerate(posts_to_download):
-            print(f"  Attempting download {i+1}/{num_posts_found} for tag '{tag}'...")
-            if download_image_from_booru(post_data, pokemon_dir):
-                 current_pokemon_downloaded += 1
-            # The necessary delay is already inside download_image_from_booru or fetch_booru_posts
 
         print(f"\nFinished processing '{tag}'. Successfully downloaded {current_pokemon_downloaded}/{num_posts_found} images.")
         total_downloaded_count += current_pokemon_downloaded
@@ -233,4 +351,6 @@ if __name__ == "__main__":
     print(f"Attempted to download metadata for {total_attempted} posts across all tags.")
     print(f"Successfully downloaded {total_downloaded_count} images in total.")
     print(f"Images saved in subdirectories within: {OUTPUT_DIR}")
-    print("\nReminder: You will likely need to manually review, clean, and annotate these images before training a model.")
\ No newline at end of file
+    TRACE.summary("Danbooru run")
+    print("\nReminder: You will likely need to manually review, clean, and annotate these images before training a model.")
+    print("Run detection_filter.py first to set aside images the trained detector doesn't recognize.")
\ No newline at end of file
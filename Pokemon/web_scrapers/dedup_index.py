@@ -0,0 +1,150 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES blobs(sha256)
+);
+CREATE TABLE IF NOT EXISTS rejected (
+    sha256 TEXT PRIMARY KEY,
+    reason TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rejected_links (
+    path TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    reason TEXT NOT NULL
+);
+"""
+
+
+def link_or_copy(src, dest):
+    """Hard-links src to dest, falling back to a copy where links are not supported."""
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+class DedupIndex:
+    """Persistent URL -> content hash -> stored file index shared across scraper runs.
+
+    Every distinct image body is written once under `store_dir`, named by its SHA-256,
+    and linked into each Pokémon's directory. URLs seen in an earlier run resolve to
+    their stored file without touching the network.
+    """
+
+    def __init__(self, db_path, store_dir):
+        self.db_path = db_path
+        self.store_dir = store_dir
+        self._conn = None
+        self._lock = threading.Lock() # The scrapers call in from several download threads
+
+    def _connect(self):
+        # Opened lazily so importing a scraper doesn't create its output directory
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def path_for_url(self, url):
+        """Returns the stored file for a URL downloaded in any run, or None if unknown."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT b.path FROM urls u JOIN blobs b ON u.sha256 = b.sha256 WHERE u.url = ?", (url,)
+            ).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def reject(self, sha256, reason):
+        """Marks content as unwanted (e.g. replaced by a larger copy), so it is never linked or stored again."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO rejected (sha256, reason) VALUES (?, ?)", (sha256, reason))
+            conn.commit()
+
+    def reject_url(self, url, content, reason):
+        """Records `url` with the hash of `content` and rejects that content, so re-runs skip the URL without fetching it."""
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)", (url, digest))
+            conn.execute("INSERT OR REPLACE INTO rejected (sha256, reason) VALUES (?, ?)", (digest, reason))
+            conn.commit()
+
+    def reject_link(self, dest_path, sha256, reason):
+        """Marks one linked copy as unwanted (e.g. the wrong Pokemon for its directory): only that path is never linked again."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO rejected_links (path, sha256, reason) VALUES (?, ?, ?)",
+                         (os.path.abspath(dest_path), sha256, reason))
+            conn.commit()
+
+    def is_rejected_url(self, url):
+        """True if the content last fetched from `url` was rejected."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM urls u JOIN rejected r ON u.sha256 = r.sha256 WHERE u.url = ?", (url,)
+            ).fetchone()
+        return row is not None
+
+    def add(self, url, content, dest_path):
+        """Stores `content` once by hash, records `url` and links the stored file to dest_path.
+
+        Returns True if dest_path was created, False if it already existed or the content was rejected.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        extension = os.path.splitext(dest_path)[1]
+        blob_path = os.path.join(self.store_dir, digest[:2], digest + extension)
+
+        with self._lock:
+            conn = self._connect()
+            if conn.execute("SELECT 1 FROM rejected WHERE sha256 = ?", (digest,)).fetchone():
+                conn.execute("INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)", (url, digest))
+                conn.commit()
+                return False
+            row = conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+        known_path = row[0] if row and os.path.exists(row[0]) else None
+
+        if known_path is None:
+            # Write outside the lock so disk I/O from different threads still overlaps
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, blob_path)
+
+        with self._lock:
+            conn = self._connect()
+            if known_path is None:
+                conn.execute("INSERT OR REPLACE INTO blobs (sha256, path, size) VALUES (?, ?, ?)", (digest, blob_path, len(content)))
+            conn.execute("INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)", (url, digest))
+            conn.commit()
+
+        return self.link_into(known_path or blob_path, dest_path)
+
+    def link_into(self, stored_path, dest_path):
+        """Links a stored file into a Pokémon directory. Returns False if dest_path already exists or was rejected."""
+        if os.path.exists(dest_path):
+            return False
+        with self._lock:
+            if self._connect().execute("SELECT 1 FROM rejected_links WHERE path = ?", (os.path.abspath(dest_path),)).fetchone():
+                return False
+        link_or_copy(stored_path, dest_path)
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
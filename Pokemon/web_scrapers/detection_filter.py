@@ -0,0 +1,322 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from PIL import Image
+
+from dedup_index import DedupIndex
+from species_names import BULBAPEDIA_DIR, DANBOORU_DIR, dedup_paths, pokemon_for_tag
+
+# --- Configuration ---
+# Scraper output roots; each holds one directory per Pokemon (directories starting with '_' are skipped)
+SOURCE_DIRS = [BULBAPEDIA_DIR, DANBOORU_DIR]
+
+# Detector trained in yolo_train/training_yolo_model.ipynb
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "yolo_train", "runs", "detect", "train", "weights", "best.pt")
+IMGSZ = 640 # Same as training (imgsz=640)
+BATCH_SIZE = 32 # Images per forward pass
+
+CONF_THRESHOLD = 0.5 # A detection of the expected species at or above this keeps the image
+MIN_CONF = 0.05 # Detections cached / written to the manifest; CONF_THRESHOLD can change without re-running the model
+
+# Detection cache (by file hash and model hash) and the manifest of the latest run
+DETECTIONS_DIR = "./pokemon_pics/_detections"
+CACHE_DB = os.path.join(DETECTIONS_DIR, "cache.sqlite")
+MANIFEST_PATH = os.path.join(DETECTIONS_DIR, "manifest.jsonl")
+
+# What happens to images without a confident detection: 'move' to <root>/_rejected/<pokemon>/, 'drop' deletes, 'none' only reports
+ACTION = 'move'
+REJECTED_DIR_NAME = "_rejected"
+
+WORKERS = os.cpu_count() or 4
+IN_FLIGHT_PER_WORKER = 4 # Decoded images queued per worker on top of one batch
+# --- End Configuration ---
+
+LETTERBOX_FILL = 114 # Padding grey used by ultralytics' own letterbox
+
+# Hashes already in the cache, set once per prefetch worker so cached files are hashed but never decoded
+_KNOWN_HASHES = frozenset()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    sha256 TEXT NOT NULL,
+    model TEXT NOT NULL,
+    detections TEXT NOT NULL,
+    PRIMARY KEY (sha256, model)
+);
+"""
+
+
+def species_key(name):
+    """Directory names and model class names both become the Pokemon name ('rotom_(mow)', 'Rotom-Mow' -> 'rotom-mow')."""
+    return pokemon_for_tag(name)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DetectionCache:
+    """sha256 of an image file + model hash -> detections, persisted in SQLite between runs."""
+
+    def __init__(self, db_path, model_hash):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.model_hash = model_hash
+        self._conn = sqlite3.connect(db_path)
+        self._conn.executescript(SCHEMA)
+
+    def known_hashes(self):
+        rows = self._conn.execute("SELECT sha256 FROM detections WHERE model = ?", (self.model_hash,))
+        return frozenset(row[0] for row in rows)
+
+    def get(self, sha256):
+        row = self._conn.execute("SELECT detections FROM detections WHERE sha256 = ? AND model = ?",
+                                 (sha256, self.model_hash)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, items):
+        """Stores [(sha256, detections), ...] in one transaction (called once per batch)."""
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO detections VALUES (?, ?, ?)",
+                                   [(sha256, self.model_hash, json.dumps(detections)) for sha256, detections in items])
+
+    def close(self):
+        self._conn.close()
+
+
+def iter_images(source_dirs):
+    """Yields (path, pokemon) for every file in the scraper output roots, skipping '_' directories."""
+    for root in source_dirs:
+        if not os.path.isdir(root):
+            continue
+        for species_entry in os.scandir(root):
+            if not species_entry.is_dir() or species_entry.name.startswith('_'):
+                continue
+            for file_entry in os.scandir(species_entry.path):
+                if file_entry.is_file():
+                    yield file_entry.path, species_entry.name
+
+
+def init_worker(known_hashes):
+    global _KNOWN_HASHES
+    _KNOWN_HASHES = known_hashes
+
+
+def prepare_image(path, imgsz=IMGSZ):
+    """Hashes one file and, unless its detections are cached, decodes and letterboxes it. Runs in a worker process.
+
+    Returns (sha256, letterboxed uint8 HWC RGB array or None, (scale, pad_x, pad_y) or None, error or None).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if sha256 in _KNOWN_HASHES:
+        return sha256, None, None, None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            original_size = img.size # Boxes are mapped back to the size on disk
+            img.draft('RGB', (imgsz, imgsz)) # JPEGs decode straight at a reduced scale
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # Flatten transparency onto white, as normalize_images.py does
+                rgba = img.convert('RGBA')
+                rgb = Image.new('RGB', rgba.size, (255, 255, 255))
+                rgb.paste(rgba, mask=rgba.getchannel('A'))
+            else:
+                rgb = img.convert('RGB')
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        return sha256, None, None, f"unreadable ({type(e).__name__})"
+
+    # Letterbox: fit inside imgsz x imgsz keeping the aspect ratio, pad the rest centred
+    scale = min(imgsz / rgb.width, imgsz / rgb.height)
+    resized = rgb.resize((max(1, round(rgb.width * scale)), max(1, round(rgb.height * scale))), Image.BILINEAR)
+    pad_x, pad_y = (imgsz - resized.width) // 2, (imgsz - resized.height) // 2
+    canvas = Image.new('RGB', (imgsz, imgsz), (LETTERBOX_FILL,) * 3)
+    canvas.paste(resized, (pad_x, pad_y))
+    scale = resized.width / original_size[0] # From pixels on disk, including any draft() reduction
+    return sha256, np.asarray(canvas), (scale, pad_x, pad_y), None
+
+
+def load_model(model_path=MODEL_PATH):
+    # Imported here: the prefetch workers import this module too and never need torch
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def detect_batch(model, images, min_conf=MIN_CONF):
+    """Runs the detector on a list of letterboxed arrays in one forward pass.
+
+    Returns one [(class name, conf, [x1, y1, x2, y2] in letterbox pixels), ...] list per image.
+    """
+    import torch
+    # A BCHW float tensor in 0..1 skips ultralytics' own preprocessing (the images are letterboxed already)
+    batch = torch.from_numpy(np.stack(images)).permute(0, 3, 1, 2).float().div_(255)
+    results = model.predict(batch, conf=min_conf, device='cpu', verbose=False)
+    return [[(model.names[int(cls)], float(conf), box)
+             for box, conf, cls in zip(r.boxes.xyxy.tolist(), r.boxes.conf.tolist(), r.boxes.cls.tolist())]
+            for r in results]
+
+
+def to_detections(raw, transform):
+    """Detections as manifest dicts, boxes mapped from letterbox back to pixels of the file on disk."""
+    scale, pad_x, pad_y = transform
+    return [{'label': label, 'conf': round(conf, 4),
+             'box': [round((box[0] - pad_x) / scale, 1), round((box[1] - pad_y) / scale, 1),
+                     round((box[2] - pad_x) / scale, 1), round((box[3] - pad_y) / scale, 1)]}
+            for label, conf, box in raw]
+
+
+def verdict(pokemon, detections, known_species, conf_threshold=CONF_THRESHOLD):
+    """('kept' | 'rejected' | 'unchecked', best confidence for the expected species)."""
+    expected = species_key(pokemon)
+    if expected not in known_species:
+        return 'unchecked', None # The detector was never trained on this Pokemon, so it can't judge the image
+    best = max((d['conf'] for d in detections if species_key(d['label']) == expected), default=0.0)
+    return ('kept' if best >= conf_threshold else 'rejected'), best
+
+
+def reject(path, pokemon, action):
+    """Moves the file to <root>/_rejected/<pokemon>/ or deletes it. Returns the new path (None if deleted or left)."""
+    if action == 'drop':
+        os.remove(path)
+        return None
+    if action == 'move':
+        root = os.path.dirname(os.path.dirname(path))
+        dest_dir = os.path.join(root, REJECTED_DIR_NAME, pokemon)
+        os.makedirs(dest_dir, exist_ok=True)
+        dest = os.path.join(dest_dir, os.path.basename(path))
+        shutil.move(path, dest)
+        return dest
+    return None
+
+
+def filter_images(source_dirs=SOURCE_DIRS, model_path=MODEL_PATH, conf_threshold=CONF_THRESHOLD, action=ACTION,
+                  batch_size=BATCH_SIZE, workers=WORKERS, cache_db=CACHE_DB, manifest_path=MANIFEST_PATH, model=None):
+    """Checks every scraped image with the detector and keeps only those showing the expected Pokemon.
+
+    Worker processes hash, decode and letterbox files while the main process runs
+    the model on full batches. Files whose hash is already cached for these weights
+    skip decoding and inference entirely, so re-runs only pay for new files.
+    """
+    model = model or load_model(model_path)
+    known_species = {species_key(name) for name in model.names.values()}
+    dedup_by_root = {} # Each root's DedupIndex: moved or dropped images are marked rejected there so the scrapers never re-link them
+
+    def dedup_for(path):
+        root = os.path.dirname(os.path.dirname(path))
+        if root not in dedup_by_root:
+            db_path, store_dir = dedup_paths(root)
+            dedup_by_root[root] = DedupIndex(db_path, store_dir) if os.path.exists(db_path) else None
+        return dedup_by_root[root]
+    cache = DetectionCache(cache_db, file_hash(model_path))
+    stats = {'kept': 0, 'rejected': 0, 'unchecked': 0, 'unreadable': 0, 'cached': 0, 'inferred': 0}
+    timings = {'inference': 0.0}
+    start = time.time()
+
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    manifest = open(manifest_path, 'w', encoding='utf-8')
+
+    def record(path, pokemon, sha256, detections, error=None):
+        if error:
+            status, best = 'unreadable', None
+        else:
+            status, best = verdict(pokemon, detections, known_species, conf_threshold)
+        moved_to = None
+        if status in ('rejected', 'unreadable'):
+            moved_to = reject(path, pokemon, action)
+            dedup = dedup_for(path)
+            if action in ('move', 'drop') and dedup and sha256:
+                if status == 'unreadable':
+                    dedup.reject(sha256, f"detection_filter: {error}") # Broken for every Pokemon it is linked to
+                else:
+                    # The same file is often linked into several Pokemon's directories (Rotom forms, group art):
+                    # only this directory's copy is wrong
+                    dedup.reject_link(path, sha256, f"detection_filter: not {pokemon}")
+        stats[status] += 1
+        manifest.write(json.dumps({'path': path, 'pokemon': pokemon, 'sha256': sha256, 'status': status,
+                                   'best_conf': best, 'detections': detections, 'error': error,
+                                   'moved_to': moved_to}) + '\n')
+        if status in ('rejected', 'unreadable'):
+            print(f"  {status.capitalize()} {path}" + (f" (best {best:.2f})" if best is not None else f" ({error})"))
+
+    batch = []
+
+    def run_batch():
+        inference_start = time.time()
+        raw = detect_batch(model, [image for _, _, _, image, _ in batch])
+        timings['inference'] += time.time() - inference_start
+        results = [(sha256, to_detections(detections, transform))
+                   for (_, _, sha256, _, transform), detections in zip(batch, raw)]
+        cache.put_many(results)
+        for (path, pokemon, _, _, _), (sha256, detections) in zip(batch, results):
+            record(path, pokemon, sha256, detections)
+        stats['inferred'] += len(batch)
+        batch.clear()
+
+    def collect(done):
+        for future in done:
+            path, pokemon = pending.pop(future)
+            try:
+                sha256, image, transform, error = future.result()
+            except Exception as e:
+                sha256, image, transform, error = None, None, None, f"error ({e})"
+            if error:
+                record(path, pokemon, sha256, [], error)
+            elif image is None:
+                stats['cached'] += 1
+                record(path, pokemon, sha256, cache.get(sha256))
+            else:
+                batch.append((path, pokemon, sha256, image, transform))
+                if len(batch) >= batch_size:
+                    run_batch()
+
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(cache.known_hashes(),)) as executor:
+        for path, pokemon in iter_images(source_dirs):
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER + batch_size:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[executor.submit(prepare_image, path)] = (path, pokemon)
+        collect(wait(pending)[0])
+    if batch:
+        run_batch()
+    manifest.close()
+    cache.close()
+
+    elapsed = time.time() - start
+    processed = sum(stats[status] for status in ('kept', 'rejected', 'unchecked', 'unreadable'))
+    print(f"\nChecked {processed} images in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} images/s), "
+          f"{stats['cached']} from cache")
+    if stats['inferred']:
+        print(f"Inference: {stats['inferred']} images in {timings['inference']:.1f}s "
+              f"({stats['inferred'] / timings['inference'] if timings['inference'] else 0:.1f} images/s)")
+    print(f"Kept {stats['kept']}, rejected {stats['rejected']}, unreadable {stats['unreadable']}, "
+          f"unchecked {stats['unchecked']} (Pokemon the detector doesn't know)")
+    print(f"Manifest: {os.path.abspath(manifest_path)}")
+    return stats
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter scraped images with the trained YOLO detector.")
+    parser.add_argument('sources', nargs='*', default=SOURCE_DIRS, help="Scraper output roots (default: both scrapers' output dirs)")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--conf', type=float, default=CONF_THRESHOLD)
+    parser.add_argument('--action', choices=['move', 'drop', 'none'], default=ACTION)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    args = parser.parse_args()
+
+    filter_images(args.sources, args.model, args.conf, args.action, args.batch_size, args.workers,
+                  manifest_path=args.manifest)
@@ -0,0 +1,423 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+# --- Configuration ---
+MAX_CONCURRENT_DOWNLOADS = 8 # Transfers in flight at once, across all hosts
+
+DOWNLOAD_TIMEOUT = 30 # Seconds
+
+CHUNK_SIZE = 1024 * 64 # Bytes read per iteration of a streamed response
+
+MAX_ATTEMPTS = 3 # Tries per file: interrupted transfers resume with a Range request, throttled ones back off
+
+# Adaptive per-host rate control (see AdaptiveRateController)
+RATE_INCREASE_STEP = 0.1 # Added to the rate after each success, as a fraction of the starting rate
+RATE_DECREASE_FACTOR = 0.5 # Rate multiplier after a 429 / 5xx
+MAX_RATE_MULTIPLIER = 4 # Never go faster than this many times the starting rate
+MIN_RATE_DIVISOR = 16 # ...or slower than the starting rate divided by this
+BACKOFF_BASE = 2.0 # Seconds; doubled for each consecutive throttle when the host sends no Retry-After
+BACKOFF_MAX = 300 # Seconds
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+STREAM_QUEUE_SIZE = 200 # Items buffered between a metadata producer and the download workers
+# --- End Configuration ---
+
+
+def host_of(url):
+    """Returns the lowercase host of `url`, used as the rate-limit key."""
+    return urlparse(url).netloc.lower()
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limit_reset(headers):
+    """Seconds until the host's X-RateLimit window resets, if it says the window is used up."""
+    remaining = headers.get('X-RateLimit-Remaining')
+    reset = headers.get('X-RateLimit-Reset')
+    if remaining is None or reset is None:
+        return None
+    try:
+        remaining = int(float(remaining))
+        reset = float(reset)
+    except ValueError:
+        return None
+    if remaining > 0:
+        return None
+    # Some hosts send an epoch timestamp, others a number of seconds
+    return max(0.0, reset - time.time()) if reset > 1e9 else reset
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst` tokens.
+
+    Callers reserve a token up front, so a bucket that is already empty hands out
+    increasingly later slots instead of letting waiters race each other. Reservations
+    are guarded by a thread lock so the bucket can be shared between the event loop
+    and blocking page fetches running in worker threads.
+
+    pause() cancels the slots already handed out: a caller whose wait was overtaken by
+    a pause re-checks the bucket right before it would send, and queues again behind it.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.pauses = 0 # Bumped by pause(); reservations taken before the latest pause are void
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token. Returns (seconds the caller must wait before using it, pause count it was taken under)."""
+        with self.lock:
+            now = time.monotonic()
+            # `updated` is in the future while the bucket is paused: nothing refills until then
+            if now > self.updated:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            self.tokens -= 1
+            return (self.updated - now) + (-self.tokens / self.rate if self.tokens < 0 else 0.0), self.pauses
+
+    def pause(self, seconds):
+        """Stops the bucket for `seconds`. Waiting callers re-queue one interval apart after it, new ones behind them."""
+        with self.lock:
+            self.updated = max(self.updated, time.monotonic() + seconds)
+            self.tokens = 0 # The outstanding reservations are void, so their debt goes too
+            self.pauses += 1
+
+    async def acquire(self):
+        while True:
+            delay, pauses = self.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.pauses == pauses:
+                return
+            # A 429 paused the host while this slot was pending: sending now would land inside the pause
+
+    def acquire_blocking(self):
+        while True:
+            delay, pauses = self.reserve()
+            if delay > 0:
+                time.sleep(delay)
+            if self.pauses == pauses:
+                return
+
+
+class AdaptiveRateController(TokenBucket):
+    """TokenBucket whose rate follows the host's behaviour (AIMD).
+
+    Every successful request raises the rate by a small fixed step; a 429/5xx cuts it
+    by RATE_DECREASE_FACTOR and pauses the host for Retry-After (or the X-RateLimit
+    reset time), falling back to exponential backoff with jitter when the host gives
+    no hint. The rate stays between the configured rate / MIN_RATE_DIVISOR and
+    MAX_RATE_MULTIPLIER times it.
+    """
+
+    def __init__(self, rate, burst=1):
+        super().__init__(rate, burst)
+        self.base_rate = rate
+        self.min_rate = rate / MIN_RATE_DIVISOR
+        self.max_rate = rate * MAX_RATE_MULTIPLIER
+        self.consecutive_throttles = 0
+
+    def on_success(self, headers):
+        with self.lock:
+            self.consecutive_throttles = 0
+            self.rate = min(self.max_rate, self.rate + self.base_rate * RATE_INCREASE_STEP)
+        reset_in = parse_rate_limit_reset(headers)
+        if reset_in:
+            self.pause(reset_in)
+
+    def on_throttle(self, headers=None):
+        """Slows the host down after a 429/5xx or network error. Returns the pause in seconds."""
+        headers = headers or {}
+        with self.lock:
+            self.consecutive_throttles += 1
+            self.rate = max(self.min_rate, self.rate * RATE_DECREASE_FACTOR)
+            backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.consecutive_throttles - 1))
+        wait = parse_retry_after(headers.get('Retry-After'))
+        if wait is None:
+            wait = parse_rate_limit_reset(headers)
+        if wait is None:
+            wait = backoff * random.uniform(0.5, 1.5) # Jitter keeps parallel workers from retrying in lockstep
+        self.pause(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """Keeps one AdaptiveRateController per host so each site gets its own politeness budget."""
+
+    def __init__(self, default_delay, host_delays=None, burst=1):
+        # Delays are "seconds between requests", the same unit as REQUEST_DELAY in the scrapers.
+        # They are only the starting point: each host's rate then adapts to how it responds.
+        self.default_delay = default_delay
+        self.host_delays = host_delays or {}
+        self.burst = burst
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url):
+        host = host_of(url)
+        with self._lock:
+            if host not in self.buckets:
+                delay = self.host_delays.get(host, self.default_delay)
+                self.buckets[host] = AdaptiveRateController(1 / delay, self.burst)
+            return self.buckets[host]
+
+    async def wait(self, url):
+        await self.bucket_for(url).acquire()
+
+    def wait_blocking(self, url):
+        """Same as wait(), for code that runs outside the event loop (e.g. page fetches)."""
+        self.bucket_for(url).acquire_blocking()
+
+    def record_response(self, url, status_code, headers):
+        """Feeds a response back into the host's controller. Returns the pause if it was throttled."""
+        bucket = self.bucket_for(url)
+        if status_code in THROTTLE_STATUSES:
+            return bucket.on_throttle(headers)
+        bucket.on_success(headers)
+        return None
+
+    def record_error(self, url):
+        """Backs the host off after a connection error or timeout. Returns the pause in seconds."""
+        return self.bucket_for(url).on_throttle()
+
+
+class IncompleteDownload(requests.exceptions.RequestException):
+    """The body was shorter than advertised or failed its size/checksum check."""
+
+
+def parse_content_range_total(content_range):
+    """Returns the total size from a 'bytes start-end/total' header, or None if unknown."""
+    try:
+        total = content_range.rsplit('/', 1)[1]
+        return None if total == '*' else int(total)
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class AsyncDownloader:
+    """Fetches files concurrently on the pooled session of an HttpClient.
+
+    requests is blocking, so every transfer runs in a worker thread via
+    asyncio.to_thread; the event loop only does the scheduling, the per-host
+    rate limiting and the bounding of concurrency. Sharing the client means page
+    fetches and image downloads reuse the same keep-alive connections and the
+    same per-host rate controllers.
+    """
+
+    def __init__(self, client, max_concurrency=MAX_CONCURRENT_DOWNLOADS, timeout=DOWNLOAD_TIMEOUT, partial_dir=None):
+        self.client = client
+        self.session = client.session
+        self.rate_limiter = client.rate_limiter
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Unfinished transfers live here as <sha1(url)>.part until they are complete and verified
+        self.partial_dir = partial_dir or os.path.join(tempfile.gettempdir(), "pokemon_scraper_partial")
+
+        # A thread-level semaphore rather than an asyncio one: it holds across every event loop
+        # using this downloader, e.g. one per worker thread in the scrape orchestrator
+        self._transfer_slots = threading.BoundedSemaphore(max_concurrency)
+
+        # url -> concurrent.futures.Future of the fetch in progress. Jobs that resolve the same URL
+        # (e.g. rotom-mow and rotom-frost sharing Rotom's images) share one transfer and one .part file.
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _partial_path(self, url):
+        return os.path.join(self.partial_dir, hashlib.sha1(url.encode()).hexdigest() + '.part')
+
+    def _get_to_file(self, url, part_path, stats):
+        """Streams `url` into part_path, resuming from its current size with a Range request.
+
+        Fills `stats` with the status, time to first byte and bytes received, for the trace.
+        """
+        os.makedirs(self.partial_dir, exist_ok=True)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request_headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+        sent = time.time()
+        response = self.session.get(url, stream=True, timeout=self.timeout, headers=request_headers)
+        stats['ttfb'] = time.time() - sent # stream=True returns as soon as the headers are in
+        stats['status'] = response.status_code
+        try:
+            if response.status_code == 416:
+                # Our partial file doesn't match the server's copy any more: start over next attempt
+                os.remove(part_path)
+                raise IncompleteDownload(f"Range not satisfiable for {url}, restarting")
+            response.raise_for_status()
+            self.rate_limiter.record_response(url, response.status_code, response.headers)
+
+            if response.status_code == 206:
+                expected_total = parse_content_range_total(response.headers.get('Content-Range'))
+            else:
+                offset = 0 # Server ignored the Range header and is sending the whole file
+                content_length = response.headers.get('Content-Length')
+                expected_total = int(content_length) if content_length and not response.headers.get('Content-Encoding') else None
+
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    stats['bytes'] += len(chunk)
+
+            received = os.path.getsize(part_path)
+            if expected_total is not None and received != expected_total:
+                if received > expected_total:
+                    os.remove(part_path)
+                raise IncompleteDownload(f"Got {received} of {expected_total} bytes for {url}")
+            return response.headers
+        finally:
+            response.close()
+
+    def _transfer(self, url, part_path, retries=0, sleep=0.0):
+        """_get_to_file() inside one of the max_concurrency transfer slots, traced if the client has a trace."""
+        stats = {'status': None, 'ttfb': None, 'bytes': 0}
+        queued_from = time.time()
+        with self._transfer_slots:
+            started = time.time()
+            error = None
+            try:
+                return self._get_to_file(url, part_path, stats)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                if self.client.trace:
+                    self.client.trace.record('image', url, stats['status'], stats['bytes'], time.time() - started, ttfb=stats['ttfb'],
+                                             retries=retries, sleep=sleep, queued=started - queued_from, error=error)
+
+    def _read_verified(self, part_path, expected_size, expected_md5):
+        with open(part_path, 'rb') as f:
+            content = f.read()
+        # The partial file has served its purpose either way: a bad body must not be resumed
+        os.remove(part_path)
+        if expected_size is not None and len(content) != expected_size:
+            raise IncompleteDownload(f"Expected {expected_size} bytes, got {len(content)}")
+        if expected_md5 is not None and hashlib.md5(content).hexdigest() != expected_md5:
+            raise IncompleteDownload("MD5 checksum mismatch")
+        return content
+
+    async def fetch(self, url, expected_size=None, expected_md5=None):
+        """Returns (headers, content) for `url`. Raises requests exceptions on failure.
+
+        The body is streamed into a .part file first. A transfer that drops mid-way
+        (in this run or a killed earlier one) continues from the bytes already on disk
+        instead of starting again. expected_size / expected_md5, when known, are
+        checked before the content is handed back. If the URL is already being fetched,
+        from this event loop or another thread's, the caller waits for that result.
+        """
+        with self._in_flight_lock:
+            shared = self._in_flight.get(url)
+            if shared is None:
+                future = self._in_flight[url] = concurrent.futures.Future()
+        if shared is not None:
+            return await asyncio.wrap_future(shared)
+
+        try:
+            result = await self._fetch(url, expected_size, expected_md5)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            if not future.done():
+                future.cancel() # Cancelled mid-way: waiters get CancelledError instead of hanging
+            with self._in_flight_lock:
+                del self._in_flight[url]
+
+    async def _fetch(self, url, expected_size, expected_md5):
+        part_path = self._partial_path(url)
+        for attempt in range(MAX_ATTEMPTS):
+            # Wait for the host's slot first so a throttled host never holds a transfer slot idle
+            waited_from = time.time()
+            await self.rate_limiter.wait(url)
+            try:
+                response_headers = await asyncio.to_thread(self._transfer, url, part_path, attempt, time.time() - waited_from)
+                break
+            except requests.exceptions.HTTPError as e:
+                status_code = e.response.status_code if e.response is not None else None
+                if status_code not in THROTTLE_STATUSES or attempt == MAX_ATTEMPTS - 1:
+                    raise
+                pause = self.rate_limiter.record_response(url, status_code, e.response.headers)
+                print(f"    -> Throttled ({status_code}), backing off {pause:.1f}s: {url}")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.rate_limiter.record_error(url)
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                print(f"    -> Transfer interrupted ({e}), resuming: {url}")
+            except (requests.exceptions.ChunkedEncodingError, IncompleteDownload) as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                print(f"    -> Transfer interrupted ({e}), resuming: {url}")
+        content = await asyncio.to_thread(self._read_verified, part_path, expected_size, expected_md5)
+        return response_headers, content
+
+    def run(self, coroutines):
+        """Runs the given download coroutines to completion and returns their results in order."""
+        async def gather_all():
+            return await asyncio.gather(*coroutines)
+        return asyncio.run(gather_all())
+
+    def run_streaming(self, batches, handler, queue_size=STREAM_QUEUE_SIZE):
+        """Downloads items as soon as their batch arrives instead of collecting everything first.
+
+        `batches` is a blocking iterator (e.g. one API page per step); it is advanced in a
+        worker thread so the next batch is fetched while the current one downloads.
+        `handler` is an async function called once per item. The queue between the two
+        is bounded, so memory stays flat however many items the iterator produces.
+        Returns (items_seen, successful_items).
+        """
+        async def pipeline():
+            queue = asyncio.Queue(maxsize=queue_size)
+            counts = {'seen': 0, 'ok': 0}
+
+            async def produce():
+                try:
+                    while True:
+                        batch = await asyncio.to_thread(next, batches, None)
+                        if batch is None:
+                            break
+                        for item in batch:
+                            await queue.put(item)
+                finally:
+                    for _ in range(self.max_concurrency):
+                        await queue.put(None) # One stop marker per worker
+
+            async def consume():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    counts['seen'] += 1
+                    if await handler(item):
+                        counts['ok'] += 1
+
+            await asyncio.gather(produce(), *(consume() for _ in range(self.max_concurrency)))
+            return counts['seen'], counts['ok']
+
+        return asyncio.run(pipeline())
@@ -0,0 +1,66 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is a much faster C parser; use it when it is installed, otherwise stay on the stdlib one
+try:
+    import lxml # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+# Each strainer keeps only the elements one extractor needs. BeautifulSoup then skips
+# building Tag objects for the rest of the page, which is where most parse time goes.
+FILE_LINKS_ONLY = SoupStrainer('a', href=re.compile(r'/wiki/File:'))
+FILE_DIV_ONLY = SoupStrainer('div', id='file')
+THUMBS_ONLY = SoupStrainer(id='thumbs')
+ZEROCHAN_STATIC_LINKS_ONLY = SoupStrainer('a', href=re.compile(r'static\.zerochan\.net'))
+LARGE_ONLY = SoupStrainer(id='large')
+
+
+def parse(html, strainer=None, parser=None):
+    """Builds a (partial) soup of `html`, keeping only what `strainer` matches."""
+    return BeautifulSoup(html, parser or PARSER, parse_only=strainer)
+
+
+def extract_file_linked_images(html, parser=None):
+    """Returns (href, src, alt) for every <img> directly inside an <a> linking to a /wiki/File: page."""
+    soup = parse(html, FILE_LINKS_ONLY, parser)
+    images = []
+    for link in soup.find_all('a', href=True):
+        for img_tag in link.find_all('img', recursive=False):
+            images.append((link['href'], img_tag.get('src'), img_tag.get('alt', '')))
+    return images
+
+
+def extract_file_page_image(html, parser=None):
+    """Returns the src of the full-size image on a Bulbapedia File: page (div#file a img), or None."""
+    soup = parse(html, FILE_DIV_ONLY, parser)
+    img_tag = soup.select_one('div#file a img')
+    return img_tag.get('src') if img_tag else None
+
+
+def extract_zerochan_thumb_links(html, parser=None):
+    """Returns the hrefs of the image page links on a Zerochan listing (#thumbs > li > a:first-of-type)."""
+    soup = parse(html, THUMBS_ONLY, parser)
+    return [link.get('href') for link in soup.select('#thumbs > li > a:first-of-type')]
+
+
+def extract_zerochan_full_image(html, parser=None):
+    """Returns the full resolution image URL from a Zerochan image page, or None."""
+    # Method 1: Look for a direct link with 'static.zerochan.net'
+    link = parse(html, ZEROCHAN_STATIC_LINKS_ONLY, parser).find('a')
+    if link and link.get('href'):
+        return link['href']
+
+    # Method 2: Look for the main image display (#large) if Method 1 fails
+    large = parse(html, LARGE_ONLY, parser).find(id='large')
+    if not large:
+        return None
+    inner_link = large.find('a')
+    if inner_link and inner_link.get('href') and 'static.zerochan.net' in inner_link.get('href'):
+        return inner_link['href']
+    inner_img = large.find('img')
+    if inner_img and inner_img.get('src') and 'static.zerochan.net' in inner_img.get('src'):
+        return inner_img['src']
+    return None
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# --- Configuration ---
+POOL_SIZE = 16 # Keep-alive connections kept open per host
+
+MAX_PAGE_ATTEMPTS = 3 # Tries per HTML page when the host throttles us
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified') # Response headers replayed on a cache hit
+# --- End Configuration ---
+
+
+class PageCache:
+    """On-disk store of HTML bodies plus the validators (ETag / Last-Modified) they came with.
+
+    Each URL gets <sha1>.json (metadata) and <sha1>.body next to each other in cache_dir.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + '.json'), os.path.join(self.cache_dir, key + '.body')
+
+    def load(self, url):
+        """Returns (metadata, body) for a cached URL, or (None, None)."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, json.JSONDecodeError):
+            return None, None
+        return meta, body
+
+    def store(self, url, response):
+        """Caches a 200 response, but only if the server gave us something to revalidate with."""
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        if 'ETag' not in headers and 'Last-Modified' not in headers:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        # Body first, metadata last: a half-written entry never has metadata pointing at it
+        for path, mode, data in ((body_path, 'wb', response.content),
+                                 (meta_path, 'w', json.dumps({'url': url, 'headers': headers}))):
+            tmp_path = path + '.tmp'
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+
+def cached_response(url, meta, body):
+    """Builds a requests.Response for a cache hit so callers can't tell it apart from a 200."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(meta.get('headers', {}))
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+class HttpClient:
+    """One pooled keep-alive requests.Session shared by every fetch a scraper makes.
+
+    All requests go through the per-host rate limiter. get_page() additionally keeps an
+    on-disk cache of HTML pages and revalidates them with If-None-Match /
+    If-Modified-Since, so unchanged pages come back as bodiless 304s.
+
+    With a RequestTrace every request (here and in an AsyncDownloader on this client)
+    is also logged as a structured event.
+    """
+
+    def __init__(self, headers, rate_limiter, cache_dir=None, pool_size=POOL_SIZE, trace=None):
+        self.rate_limiter = rate_limiter
+        self.cache = PageCache(cache_dir) if cache_dir else None
+        self.trace = trace
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, timeout=15, kind='page', retries=0, **kwargs):
+        """One rate-limited GET. The host's controller has already seen the outcome on return.
+
+        `response.throttle_pause` is the pause the controller chose if the host throttled us
+        (429/5xx), else None. Connection errors back the host off and are re-raised.
+        `kind` and `retries` only label the trace event.
+        """
+        waited_from = time.time()
+        self.rate_limiter.wait_blocking(url)
+        sent = time.time()
+        try:
+            response = self.session.get(url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self.rate_limiter.record_error(url)
+            if self.trace:
+                self.trace.record(kind, url, latency=time.time() - sent, retries=retries, sleep=sent - waited_from, error=type(e).__name__)
+            raise
+        response.throttle_pause = self.rate_limiter.record_response(url, response.status_code, response.headers)
+        if self.trace:
+            # response.elapsed stops at the headers, i.e. time to first byte
+            self.trace.record(kind, url, response.status_code, len(response.content), time.time() - sent,
+                              ttfb=response.elapsed.total_seconds(), retries=retries, sleep=sent - waited_from)
+        return response
+
+    def get_page(self, url, timeout=15, kind='page'):
+        """GETs an HTML page through the conditional cache, retrying when throttled."""
+        meta, body = self.cache.load(url) if self.cache else (None, None)
+        conditional_headers = {}
+        if meta:
+            if 'ETag' in meta['headers']:
+                conditional_headers['If-None-Match'] = meta['headers']['ETag']
+            if 'Last-Modified' in meta['headers']:
+                conditional_headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        for attempt in range(MAX_PAGE_ATTEMPTS):
+            try:
+                response = self.get(url, timeout=timeout, kind=kind, retries=attempt, headers=conditional_headers)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == MAX_PAGE_ATTEMPTS - 1:
+                    raise
+                continue
+            if response.throttle_pause is None or attempt == MAX_PAGE_ATTEMPTS - 1:
+                break
+            print(f"    -> Throttled ({response.status_code}), retrying in {response.throttle_pause:.1f}s: {url}")
+
+        if response.status_code == 304 and meta:
+            return cached_response(url, meta, body)
+        response.raise_for_status()
+        response.from_cache = False
+        if self.cache:
+            self.cache.store(url, response)
+        return response
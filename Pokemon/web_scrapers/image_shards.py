@@ -0,0 +1,268 @@
+import argparse
+import json
+import mmap
+import os
+
+import numpy as np
+
+from species_names import BULBAPEDIA_DIR, DANBOORU_DIR, pokemon_for_tag
+
+# --- Configuration ---
+# Roots to pack, by source label. Each holds one directory per Pokemon; '_' directories are internal.
+SOURCE_ROOTS = {
+    'danbooru': DANBOORU_DIR,
+    'bulbapedia': BULBAPEDIA_DIR, # Also holds zerochan_* files; see source_label()
+    'object_det': os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "object_det_images"),
+}
+FILENAME_SOURCES = ('bulbapedia', 'zerochan') # Filename prefixes the Bulbapedia scraper writes
+
+ARCHIVE_DIR = "./pokemon_pics/shards"
+
+SHARD_SIZE = 256 * 1024 * 1024 # Bytes per shard file before a new one is started
+FLUSH_EVERY = 256 # Images buffered before the index is extended
+# --- End Configuration ---
+
+# One fixed-size record per image, appended to index.bin and memory-mapped by the reader
+INDEX_DTYPE = np.dtype([
+    ('shard', '<u4'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('species', '<u2'), # Position in labels.json 'species'
+    ('source', '<u1'), # Position in labels.json 'sources'
+])
+
+
+def shard_path(archive_dir, shard):
+    return os.path.join(archive_dir, f"shard-{shard:05d}.bin")
+
+
+def source_label(root_label, filename):
+    """The Bulbapedia scraper stores Zerochan images in the same tree, so its filename prefix wins."""
+    prefix = filename.split('_', 1)[0]
+    return prefix if prefix in FILENAME_SOURCES else root_label
+
+
+class ShardWriter:
+    """Appends image files to fixed-size shards and extends the index.
+
+    Layout of an archive directory:
+      shard-NNNNN.bin  raw file bodies back to back
+      index.bin        one INDEX_DTYPE record per image
+      paths.txt        original path of each image, one per line (same order as index.bin)
+      labels.json      {'species': [...], 'sources': [...]} the index's label ids point into
+
+    Bodies, paths and labels are written before the index records that refer to
+    them, so the index is always the commit point. Opening a writer cuts away
+    anything a crashed run wrote past the last complete record.
+    """
+
+    def __init__(self, archive_dir, shard_size=SHARD_SIZE):
+        self.archive_dir = archive_dir
+        self.shard_size = shard_size
+        os.makedirs(archive_dir, exist_ok=True)
+        self.index_path = os.path.join(archive_dir, "index.bin")
+        self.paths_path = os.path.join(archive_dir, "paths.txt")
+        self.labels_path = os.path.join(archive_dir, "labels.json")
+
+        try:
+            with open(self.labels_path, 'r', encoding='utf-8') as f:
+                self.labels = json.load(f)
+        except FileNotFoundError:
+            self.labels = {'species': [], 'sources': []}
+        self._label_ids = {kind: {name: i for i, name in enumerate(names)} for kind, names in self.labels.items()}
+
+        self._recover()
+        self._pending = [] # (record, path) not yet in the index
+        self._shard_file = open(shard_path(archive_dir, self.shard), 'ab')
+
+    def _recover(self):
+        index_size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        self.count = index_size // INDEX_DTYPE.itemsize
+        with open(self.index_path, 'ab') as f:
+            f.truncate(self.count * INDEX_DTYPE.itemsize)
+
+        if self.count:
+            last = np.fromfile(self.index_path, dtype=INDEX_DTYPE, offset=(self.count - 1) * INDEX_DTYPE.itemsize, count=1)[0]
+            self.shard, self.shard_end = int(last['shard']), int(last['offset']) + int(last['length'])
+        else:
+            self.shard, self.shard_end = 0, 0
+        with open(shard_path(self.archive_dir, self.shard), 'ab') as f:
+            f.truncate(self.shard_end)
+        later = self.shard + 1
+        while os.path.exists(shard_path(self.archive_dir, later)):
+            os.remove(shard_path(self.archive_dir, later))
+            later += 1
+
+        paths = []
+        if os.path.exists(self.paths_path):
+            with open(self.paths_path, 'r', encoding='utf-8') as f:
+                paths = f.read().splitlines()[:self.count]
+        with open(self.paths_path, 'w', encoding='utf-8') as f:
+            f.writelines(path + '\n' for path in paths)
+        self.packed_paths = set(paths)
+
+    def _label_id(self, kind, name):
+        ids = self._label_ids[kind]
+        if name not in ids:
+            ids[name] = len(self.labels[kind])
+            self.labels[kind].append(name)
+        return ids[name]
+
+    def add(self, data, species, source, path):
+        """Appends one image body. `path` is recorded so later runs can skip it.
+
+        `species` may be a Pokemon name or a Danbooru tag folder; both are stored as the
+        Pokemon name ('rotom_(mow)' and 'rotom-mow' -> 'rotom-mow').
+        """
+        if self.shard_end and self.shard_end + len(data) > self.shard_size:
+            self.flush()
+            self._shard_file.close()
+            self.shard, self.shard_end = self.shard + 1, 0
+            self._shard_file = open(shard_path(self.archive_dir, self.shard), 'ab')
+        self._shard_file.write(data)
+        record = (self.shard, self.shard_end, len(data), self._label_id('species', pokemon_for_tag(species)), self._label_id('sources', source))
+        self.shard_end += len(data)
+        self._pending.append((record, path))
+        self.packed_paths.add(path)
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._shard_file.flush()
+        os.fsync(self._shard_file.fileno())
+        with open(self.paths_path, 'a', encoding='utf-8') as f:
+            f.writelines(path + '\n' for _, path in self._pending)
+        tmp_path = self.labels_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.labels, f, indent=2)
+        os.replace(tmp_path, self.labels_path)
+        # Last: once these records are on disk the images exist for readers
+        with open(self.index_path, 'ab') as f:
+            f.write(np.array([record for record, _ in self._pending], dtype=INDEX_DTYPE).tobytes())
+        self.count += len(self._pending)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self._shard_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ShardReader:
+    """Random access and sequential streaming over an archive written by ShardWriter.
+
+    The index and every shard are memory-mapped, so reader[i] is a memoryview straight
+    into the page cache: no read() call and no copy until the caller decodes it.
+    """
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        try:
+            with open(os.path.join(archive_dir, "labels.json"), 'r', encoding='utf-8') as f:
+                self.labels = json.load(f)
+        except FileNotFoundError: # Written on the first flush; an archive without one holds no records yet
+            self.labels = {'species': [], 'sources': []}
+        index_path = os.path.join(archive_dir, "index.bin")
+        count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize if os.path.exists(index_path) else 0
+        self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r', shape=(count,)) if count else np.zeros(0, dtype=INDEX_DTYPE)
+        self._shards = {}
+        self._paths = None
+
+    def _shard(self, shard):
+        if shard not in self._shards:
+            with open(shard_path(self.archive_dir, shard), 'rb') as f:
+                self._shards[shard] = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._shards[shard]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        """Bytes of image i as a zero-copy memoryview (e.g. Image.open(io.BytesIO(reader[i])))."""
+        record = self.index[i]
+        offset = int(record['offset'])
+        return self._shard(int(record['shard']))[offset:offset + int(record['length'])]
+
+    def label(self, i):
+        """Returns (species, source) for image i."""
+        record = self.index[i]
+        return pokemon_for_tag(self.labels['species'][record['species']]), self.labels['sources'][record['source']]
+
+    def species_ids(self, species):
+        """Label ids of a species. Archives packed before labels were normalized can hold several ('rotom_(mow)', 'rotom-mow')."""
+        key = pokemon_for_tag(species)
+        return [i for i, name in enumerate(self.labels['species']) if pokemon_for_tag(name) == key]
+
+    def path(self, i):
+        if self._paths is None:
+            with open(os.path.join(self.archive_dir, "paths.txt"), 'r', encoding='utf-8') as f:
+                self._paths = f.read().splitlines()
+        return self._paths[i]
+
+    def select(self, species=None, source=None):
+        """Indices of the images with the given species and/or source label."""
+        mask = np.ones(len(self.index), dtype=bool)
+        if species is not None:
+            mask &= np.isin(self.index['species'], self.species_ids(species))
+        if source is not None:
+            mask &= self.index['source'] == self.labels['sources'].index(source)
+        return np.flatnonzero(mask)
+
+    def stream(self, indices=None):
+        """Yields (i, memoryview) in on-disk order, so each shard is read front to back."""
+        indices = np.arange(len(self.index)) if indices is None else np.asarray(indices)
+        order = np.lexsort((self.index['offset'][indices], self.index['shard'][indices]))
+        for i in indices[order]:
+            yield int(i), self[i]
+
+    def close(self):
+        for view in self._shards.values():
+            view.release()
+        self._shards = {}
+
+
+def pack(source_roots=SOURCE_ROOTS, archive_dir=ARCHIVE_DIR, shard_size=SHARD_SIZE):
+    """Appends every file under the source roots that is not in the archive yet. Returns the number added."""
+    added = 0
+    with ShardWriter(archive_dir, shard_size) as writer:
+        for root_label, root in source_roots.items():
+            if not os.path.isdir(root):
+                continue
+            for species_entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+                if not species_entry.is_dir() or species_entry.name.startswith('_'):
+                    continue
+                for file_entry in sorted(os.scandir(species_entry.path), key=lambda entry: entry.name):
+                    path = os.path.abspath(file_entry.path)
+                    if not file_entry.is_file() or path in writer.packed_paths:
+                        continue
+                    with open(path, 'rb') as f:
+                        writer.add(f.read(), species_entry.name, source_label(root_label, file_entry.name), path)
+                    added += 1
+    print(f"Packed {added} new images into {archive_dir} ({writer.count} in total)")
+    return added
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack scraped images into sharded archives, or list an archive.")
+    parser.add_argument('command', choices=['pack', 'info'])
+    parser.add_argument('--archive', default=ARCHIVE_DIR)
+    parser.add_argument('--shard-size-mb', type=int, default=SHARD_SIZE // (1024 * 1024))
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        pack(archive_dir=args.archive, shard_size=args.shard_size_mb * 1024 * 1024)
+    else:
+        reader = ShardReader(args.archive)
+        print(f"{len(reader)} images, {int(reader.index['length'].sum()) / 1e6:.1f} MB")
+        for source_id, source in enumerate(reader.labels['sources']):
+            print(f"  {source}: {int((reader.index['source'] == source_id).sum())} images")
+        for species in sorted({pokemon_for_tag(name) for name in reader.labels['species']}):
+            print(f"  {species}: {len(reader.select(species=species))} images")
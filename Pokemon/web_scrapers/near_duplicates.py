@@ -0,0 +1,254 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+
+import numpy as np
+from PIL import Image
+
+# --- Configuration ---
+HASH_SIZE = 8 # 8x8 difference hash -> 64-bit fingerprint
+
+NEAR_DUPLICATE_DISTANCE = 6 # Max differing bits (out of 64) for two images to count as the same artwork
+# --- End Configuration ---
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS phashes (
+    sha256 TEXT PRIMARY KEY,
+    phash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    pixels INTEGER,
+    bytes INTEGER
+);
+"""
+
+
+def dhash(content, hash_size=HASH_SIZE):
+    """Difference hash of an encoded image: one bit per pair of horizontally adjacent pixels."""
+    return dhash_and_pixels(content, hash_size)[0]
+
+
+def dhash_and_pixels(content, hash_size=HASH_SIZE):
+    """(difference hash, width * height) of an encoded image, from one decode."""
+    with Image.open(io.BytesIO(content)) as img:
+        pixel_count = img.size[0] * img.size[1]
+        # For JPEGs this lets the decoder downscale while decoding instead of building the full bitmap
+        img.draft('L', (hash_size * 8, hash_size * 8))
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big'), pixel_count
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance.
+
+    A radius query only descends into children whose edge distance lies within
+    `radius` of the query's distance to the current node (triangle inequality),
+    so lookups touch a small part of the tree instead of every stored hash.
+    """
+
+    def __init__(self):
+        self.root = None # [hash, item, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}]
+                return
+            node = child
+
+    def find(self, value, radius):
+        """Returns [(distance, item), ...] for every stored hash within `radius`, closest first."""
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                matches.append((distance, node[1]))
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class Entry:
+    """A hashed image in the tree. Superseded or released entries stay in the tree but are skipped."""
+
+    def __init__(self, sha256, phash, path, pixels, nbytes, committed):
+        self.sha256 = sha256
+        self.phash = phash
+        self.path = path
+        self.pixels = pixels # None for rows written before sizes were recorded
+        self.bytes = nbytes
+        self.committed = committed
+        self.alive = True
+        self.supersedes = [] # Smaller copies this claim replaces on commit
+        self.superseded_by = None
+
+    def size(self):
+        return (self.pixels or 0, self.bytes or 0)
+
+
+class NearDuplicateFilter:
+    """Keeps one copy, the largest, of every artwork: resized / recompressed copies are rejected or replace it.
+
+    Hashes are persisted in a SQLite table (normally the same file as the DedupIndex)
+    and loaded into a BKTree on first use. Checking is split in two steps around the
+    store: claim() reserves the image's place in the tree, and commit() (after the file
+    was stored) or release() (if storing failed) settles it.
+    """
+
+    def __init__(self, db_path, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.db_path = db_path
+        self.max_distance = max_distance
+        self.tree = BKTree()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(phashes)")}
+            for column in ('pixels', 'bytes'): # Tables created before sizes were recorded
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE phashes ADD COLUMN {column} INTEGER")
+            for sha256, phash, path, pixels, nbytes in self._conn.execute("SELECT sha256, phash, path, pixels, bytes FROM phashes"):
+                phash = int(phash, 16)
+                self.tree.add(phash, Entry(sha256, phash, path, pixels, nbytes, committed=True))
+        return self._conn
+
+    def claim(self, content, path):
+        """Checks `content` (to be saved as `path`) against the images already kept.
+
+        Returns (claim, near_duplicate):
+          (None, path of a kept copy)  a near-duplicate at least as large is kept: skip `content`
+          (claim, None)                keep `content`; pass the claim to commit() once it is stored,
+                                       or to release() if storing fails
+          (None, None)                 byte-identical to a kept image (the DedupIndex links those)
+                                       or undecodable: keep it, nothing to register
+        A kept copy with fewer pixels (or, at equal pixels, fewer bytes), such as the 250px
+        thumbnail of the original being claimed, is replaced on commit().
+        """
+        sha256 = hashlib.sha256(content).hexdigest()
+        try:
+            phash, pixels = dhash_and_pixels(content)
+        except Exception:
+            return None, None
+
+        # Lookup and insert under one lock so two reposts in the same batch can't both get in
+        with self._lock:
+            self._connect()
+            matches = [entry for _, entry in self.tree.find(phash, self.max_distance) if entry.alive]
+            if any(entry.sha256 == sha256 for entry in matches):
+                return None, None
+            claim = Entry(sha256, phash, path, pixels, len(content), committed=False)
+            for entry in matches:
+                if entry.pixels is None or entry.size() >= claim.size():
+                    return None, entry.path
+            # Pending claims stay visible, so a third copy arriving meanwhile is compared against this one
+            claim.supersedes = matches
+            self.tree.add(phash, claim)
+        return claim, None
+
+    def commit(self, claim):
+        """Records a claimed image after it was stored. Returns (path, sha256) of the smaller copies it deleted.
+
+        Replaced files in the claim's own directory are deleted; copies kept for another
+        Pokemon's directory stay on disk but are no longer matched against. Returns None
+        if a larger copy claimed meanwhile has already replaced this one (its file is removed).
+        """
+        if claim is None:
+            return []
+        replaced = []
+        with self._lock:
+            conn = self._connect()
+            if not claim.alive:
+                if claim.superseded_by is not None and self._same_dir(claim, claim.superseded_by) and os.path.exists(claim.path):
+                    os.remove(claim.path)
+                return None
+            for entry in claim.supersedes:
+                if not entry.alive:
+                    continue
+                entry.alive = False
+                entry.superseded_by = claim
+                conn.execute("DELETE FROM phashes WHERE sha256 = ?", (entry.sha256,))
+                if self._same_dir(entry, claim) and os.path.exists(entry.path):
+                    os.remove(entry.path)
+                    replaced.append((entry.path, entry.sha256))
+            claim.committed = True
+            conn.execute("INSERT OR REPLACE INTO phashes (sha256, phash, path, pixels, bytes) VALUES (?, ?, ?, ?, ?)",
+                         (claim.sha256, f"{claim.phash:016x}", claim.path, claim.pixels, claim.bytes))
+            conn.commit()
+        return replaced
+
+    def release(self, claim):
+        """Drops a claim whose image was not stored, so no hash points at a missing file."""
+        if claim is not None:
+            with self._lock:
+                claim.alive = False
+
+    @staticmethod
+    def _same_dir(a, b):
+        return os.path.dirname(a.path) == os.path.dirname(b.path)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def store_unique(dedup, near_dupes, url, content, dest_path):
+    """Stores an image through a DedupIndex unless the NearDuplicateFilter keeps a copy at least as large.
+
+    claim -> dedup.add -> commit (or release if nothing was stored), then the smaller
+    copies the image replaced are rejected in `dedup`. A skipped image's URL is rejected
+    too, so re-runs pass over it without downloading it again.
+
+    Returns (saved, skipped, replaced): saved is True if dest_path was created, skipped
+    says why a near-duplicate was not kept (None otherwise) and replaced lists the
+    paths of the smaller copies that were deleted.
+    """
+    claim, near_duplicate = near_dupes.claim(content, dest_path)
+    if near_duplicate:
+        skipped = f"near-duplicate of {near_duplicate}"
+        dedup.reject_url(url, content, skipped)
+        return False, skipped, []
+
+    saved = False
+    try:
+        saved = dedup.add(url, content, dest_path)
+    finally:
+        if not saved:
+            near_dupes.release(claim) # Never leave a hash pointing at a file that wasn't stored
+    if not saved:
+        return False, None, []
+
+    replaced = near_dupes.commit(claim)
+    if replaced is None:
+        skipped = "a larger copy was saved meanwhile"
+        dedup.reject_url(url, content, skipped)
+        return False, skipped, []
+    for _, sha256 in replaced:
+        dedup.reject(sha256, f"smaller copy of {dest_path}")
+    return True, None, [path for path, _ in replaced]
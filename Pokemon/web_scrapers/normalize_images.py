@@ -0,0 +1,137 @@
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from PIL import Image
+
+from species_names import BULBAPEDIA_DIR, DANBOORU_DIR, pokemon_for_tag
+
+# --- Configuration ---
+# Scraper output roots; each holds one directory per Pokemon (directories starting with '_' are internal)
+SOURCE_DIRS = [BULBAPEDIA_DIR, DANBOORU_DIR]
+
+# Training-ready copies, one <pokemon>/<file>.jpg directory per Pokemon ('rotom_(mow)' and 'rotom-mow' both go to rotom-mow/)
+OUTPUT_DIR = "./pokemon_pics/training_images"
+
+MAX_SIDE = 640 # Longest side after resizing; matches imgsz=640 in training_yolo_model.ipynb
+MIN_SIDE = 64 # Images with a shorter side than this are icons/sprites, not training material
+JPEG_QUALITY = 90
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP', 'BMP'}
+
+WORKERS = os.cpu_count() or 4
+IN_FLIGHT_PER_WORKER = 4 # Files queued per worker; keeps memory flat however many files there are
+# --- End Configuration ---
+
+
+def iter_jobs(source_dirs, output_dir):
+    """Yields (source_path, dest_path) for every file that has no up-to-date output yet.
+
+    Destination directories are Pokemon names, so a Danbooru tag folder and the Bulbapedia
+    folder of the same Pokemon become one training class.
+    """
+    for root in source_dirs:
+        if not os.path.isdir(root):
+            continue
+        for species_entry in os.scandir(root):
+            if not species_entry.is_dir() or species_entry.name.startswith('_'):
+                continue
+            dest_dir = os.path.join(output_dir, pokemon_for_tag(species_entry.name))
+            for file_entry in os.scandir(species_entry.path):
+                if not file_entry.is_file():
+                    continue
+                dest_path = os.path.join(dest_dir, os.path.splitext(file_entry.name)[0] + '.jpg')
+                if os.path.exists(dest_path) and os.path.getmtime(dest_path) >= file_entry.stat().st_mtime:
+                    continue # Already normalized in an earlier run
+                yield file_entry.path, dest_path
+
+
+def normalize_image(source_path, dest_path, max_side=MAX_SIDE, min_side=MIN_SIDE):
+    """Validates one image and writes a resized RGB JPEG copy. Runs in a worker process.
+
+    Returns (status, reason, bytes_in, bytes_out) where status is 'kept' or 'rejected'.
+    """
+    bytes_in = os.path.getsize(source_path)
+    try:
+        with Image.open(source_path) as img:
+            # Image.open only parses the header: format and size are known before any pixel is decoded
+            if img.format not in ALLOWED_FORMATS:
+                return 'rejected', f"format {img.format}", bytes_in, 0
+            if min(img.size) < min_side:
+                return 'rejected', 'too small', bytes_in, 0
+
+            # JPEGs can decode straight at a reduced scale (1/2, 1/4, 1/8), which is most of the saving
+            img.draft('RGB', (max_side, max_side))
+            img.load() # Raises on truncated / corrupt bodies
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # Flatten transparency onto white instead of letting it turn black
+                rgba = img.convert('RGBA')
+                rgb = Image.new('RGB', rgba.size, (255, 255, 255))
+                rgb.paste(rgba, mask=rgba.getchannel('A'))
+            else:
+                rgb = img.convert('RGB')
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        return 'rejected', f"unreadable ({type(e).__name__})", bytes_in, 0
+
+    rgb.thumbnail((max_side, max_side), Image.LANCZOS) # Only ever shrinks, keeps the aspect ratio
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    rgb.save(tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp_path, dest_path)
+    return 'kept', None, bytes_in, os.path.getsize(dest_path)
+
+
+def normalize_all(source_dirs=SOURCE_DIRS, output_dir=OUTPUT_DIR, max_side=MAX_SIDE, workers=WORKERS):
+    """Streams every new scraped image through normalize_image() on a process pool.
+
+    Files are submitted as the directory walk finds them, with at most
+    workers * IN_FLIGHT_PER_WORKER outstanding, so the first results arrive
+    immediately and the file list is never held in memory.
+    """
+    stats = {'kept': 0, 'rejected': 0, 'bytes_in': 0, 'bytes_out': 0}
+    reasons = {}
+    start = time.time()
+
+    def collect(done):
+        for future in done:
+            source_path, _ = pending.pop(future)
+            try:
+                status, reason, bytes_in, bytes_out = future.result()
+            except Exception as e:
+                status, reason, bytes_in, bytes_out = 'rejected', f"error ({e})", 0, 0
+            stats[status] += 1
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            if status == 'rejected':
+                reasons[reason] = reasons.get(reason, 0) + 1
+                print(f"  Rejected {source_path}: {reason}")
+
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for source_path, dest_path in iter_jobs(source_dirs, output_dir):
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[executor.submit(normalize_image, source_path, dest_path, max_side)] = (source_path, dest_path)
+        collect(wait(pending)[0])
+
+    elapsed = time.time() - start
+    processed = stats['kept'] + stats['rejected']
+    print(f"\nProcessed {processed} images in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} images/s)")
+    print(f"Kept {stats['kept']}, rejected {stats['rejected']} {reasons if reasons else ''}")
+    print(f"Disk: {stats['bytes_in'] / 1e6:.1f} MB of originals -> {stats['bytes_out'] / 1e6:.1f} MB normalized")
+    return stats
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate, resize and re-encode scraped images into a training directory.")
+    parser.add_argument('sources', nargs='*', default=SOURCE_DIRS, help="Scraper output roots (default: both scrapers' output dirs)")
+    parser.add_argument('--out', default=OUTPUT_DIR)
+    parser.add_argument('--max-side', type=int, default=MAX_SIDE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    normalize_all(args.sources, args.out, args.max_side, args.workers)
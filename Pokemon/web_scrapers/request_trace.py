@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from download_engine import THROTTLE_STATUSES, host_of
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class RequestTrace:
+    """Structured per-request events for one scraper run, written as JSON lines.
+
+    Every HTTP request made through HttpClient / AsyncDownloader becomes one event
+    (host, kind, status, bytes, latency, ttfb, retries, sleep), as do HTML/JSON parses
+    and saved images. The trace file is only created once the first event arrives.
+    Aggregates are kept in memory for summary().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._file = None
+        self.latencies = {} # host -> [seconds, ...]
+        self.requests = {} # host -> count
+        self.throttled = {} # host -> count
+        self.phases = {'sleep': 0.0, 'queued': 0.0, 'ttfb': 0.0, 'transfer': 0.0, 'parse': 0.0}
+        self.bytes = 0
+        self.images = 0
+
+    def _write(self, event):
+        event['t'] = round(time.time() - self.started, 4)
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(event) + '\n')
+
+    def record(self, kind, url, status=None, nbytes=0, latency=0.0, ttfb=None, retries=0, sleep=0.0, queued=0.0, error=None):
+        """One HTTP request. latency runs from sending the request to the end of the body;
+        sleep is time spent waiting for the host's rate limiter beforehand, queued the wait
+        for a free transfer slot."""
+        host = host_of(url)
+        with self._lock:
+            self._write({'kind': kind, 'host': host, 'url': url, 'status': status, 'bytes': nbytes,
+                         'latency': round(latency, 4), 'ttfb': None if ttfb is None else round(ttfb, 4),
+                         'retries': retries, 'sleep': round(sleep, 4), 'queued': round(queued, 4), 'error': error})
+            self.requests[host] = self.requests.get(host, 0) + 1
+            self.latencies.setdefault(host, []).append(latency)
+            if status in THROTTLE_STATUSES:
+                self.throttled[host] = self.throttled.get(host, 0) + 1
+            self.bytes += nbytes
+            self.phases['sleep'] += sleep
+            self.phases['queued'] += queued
+            ttfb = latency if ttfb is None else min(ttfb, latency)
+            self.phases['ttfb'] += ttfb
+            self.phases['transfer'] += latency - ttfb
+
+    @contextmanager
+    def timed_parse(self, url):
+        """Times the parse of a page (HTML extraction or JSON decoding) fetched from `url`."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            with self._lock:
+                self._write({'kind': 'parse', 'host': host_of(url), 'url': url, 'latency': round(elapsed, 4)})
+                self.phases['parse'] += elapsed
+
+    def image_saved(self, url, nbytes):
+        with self._lock:
+            self._write({'kind': 'saved', 'host': host_of(url), 'url': url, 'bytes': nbytes})
+            self.images += 1
+
+    def summary(self, title="Run summary"):
+        """Prints throughput, per-host latency and time by phase. Returns the numbers as a dict."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            elapsed = max(time.time() - self.started, 1e-9)
+            hosts = {host: {'requests': self.requests[host],
+                            'throttled': self.throttled.get(host, 0),
+                            'p50': percentile(sorted(latencies), 50),
+                            'p95': percentile(sorted(latencies), 95)}
+                     for host, latencies in self.latencies.items()}
+            result = {'elapsed': elapsed, 'images': self.images, 'bytes': self.bytes,
+                      'images_per_s': self.images / elapsed, 'bytes_per_s': self.bytes / elapsed,
+                      'hosts': hosts, 'phases': dict(self.phases)}
+
+        print(f"\n--- {title} ({elapsed:.1f}s wall) ---")
+        print(f"  {self.images} images saved: {result['images_per_s']:.2f} images/s, "
+              f"{self.bytes / 1e6:.1f} MB received: {result['bytes_per_s'] / 1e6:.2f} MB/s")
+        for host, stats in sorted(hosts.items()):
+            print(f"  {host}: {stats['requests']} requests, {stats['throttled']} throttled, "
+                  f"latency p50 {stats['p50'] * 1000:.0f} ms / p95 {stats['p95'] * 1000:.0f} ms")
+        # Phases are summed over all concurrent workers, so they can add up to more than the wall time
+        print("  Time by phase (summed over workers): " + ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in self.phases.items()))
+        if self._file is not None:
+            print(f"  Trace: {self.path}")
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
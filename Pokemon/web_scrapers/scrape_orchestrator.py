@@ -0,0 +1,175 @@
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
+
+import bulbapedia_scraper
+import danbooru_scraper
+
+# --- Configuration ---
+# Full species list (first column, 'name'), e.g. 'clodsire', 'rotom-mow'
+SPECIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "new_data", "pokemon_data.csv")
+
+SOURCES = ('bulbapedia', 'zerochan', 'danbooru')
+
+# Jobs in flight at once. This only decides how many hosts are kept busy: every job shares
+# its scraper's HostRateLimiter, so each host still gets exactly one politeness budget.
+MAX_WORKERS = 6
+
+# Status of every (species, source) job, so a crashed run restarts only the unfinished ones
+JOB_STATE_PATH = os.path.join(bulbapedia_scraper.BASE_SAVE_DIR, "orchestrator_jobs.json")
+# --- End Configuration ---
+
+
+def load_species(csv_path=SPECIES_CSV):
+    """Returns the species names from pokemon_data.csv, in file order."""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        return [row['name'] for row in csv.DictReader(f) if row.get('name')]
+
+
+def job_id(species, source):
+    return f"{source}:{species}"
+
+
+class JobTracker:
+    """Per-job progress (pending / running / done / failed) persisted as JSON after every change.
+
+    A job that was 'running' when the process died is simply not 'done', so the next
+    run picks it up again together with the pending and failed ones.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.jobs = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.jobs = {}
+
+    def reset(self):
+        with self._lock:
+            self.jobs = {}
+            self._save()
+
+    def unfinished(self, species_list, sources):
+        """Registers every (species, source) job and returns the ones not yet done, species-major."""
+        with self._lock:
+            todo = []
+            for species in species_list:
+                for source in sources:
+                    job = self.jobs.setdefault(job_id(species, source), {'species': species, 'source': source, 'status': 'pending', 'attempts': 0})
+                    if job['status'] != 'done':
+                        todo.append((species, source))
+            self._save()
+        return todo
+
+    def mark(self, species, source, status, **details):
+        with self._lock:
+            job = self.jobs[job_id(species, source)]
+            job.update(details, status=status, updated=time.strftime('%Y-%m-%d %H:%M:%S'))
+            if status == 'running':
+                job['attempts'] += 1
+            self._save()
+
+    def counts(self):
+        with self._lock:
+            totals = {}
+            for job in self.jobs.values():
+                totals[job['status']] = totals.get(job['status'], 0) + 1
+            return totals
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.jobs, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def run_job(species, source, sync=False):
+    """Scrapes one source for one species. Returns the number of new images saved.
+
+    Raises if the species page, listing or API could not be fetched, so the job is marked
+    'failed' and retried on the next run instead of being recorded as done.
+    """
+    if source == 'danbooru':
+        tag = danbooru_scraper.booru_tag(species)
+        save_dir = os.path.join(danbooru_scraper.OUTPUT_DIR, tag)
+        os.makedirs(save_dir, exist_ok=True)
+        _, downloaded = danbooru_scraper.download_booru_tag(tag, danbooru_scraper.MAX_IMAGES_PER_POKEMON, save_dir, sync=sync, raise_errors=True)
+        return downloaded
+
+    save_dir = os.path.join(bulbapedia_scraper.BASE_SAVE_DIR, bulbapedia_scraper.sanitize_filename(species))
+    os.makedirs(save_dir, exist_ok=True)
+    if source == 'bulbapedia':
+        return bulbapedia_scraper.scrape_bulbapedia(species, save_dir, raise_errors=True)
+    return bulbapedia_scraper.scrape_zerochan(species, save_dir, sync=sync, raise_errors=True)
+
+
+def worker(jobs, tracker, sync):
+    """Takes jobs off the queue until it hands out the None sentinel."""
+    while True:
+        item = jobs.get()
+        if item is None:
+            return
+        species, source = item
+        tracker.mark(species, source, 'running')
+        start = time.time()
+        try:
+            images = run_job(species, source, sync=sync)
+        except Exception as e:
+            tracker.mark(species, source, 'failed', error=str(e))
+            print(f"!! Job {job_id(species, source)} failed: {e}")
+        else:
+            tracker.mark(species, source, 'done', images=images, seconds=round(time.time() - start, 1), error=None)
+        totals = tracker.counts()
+        print(f"== Job {job_id(species, source)} finished. Progress: {totals.get('done', 0)} done, "
+              f"{totals.get('failed', 0)} failed, {totals.get('pending', 0) + totals.get('running', 0)} left ==")
+
+
+def run(species_list, sources=SOURCES, workers=MAX_WORKERS, sync=False, tracker=None):
+    """Runs every unfinished (species, source) job from a shared work queue on `workers` threads."""
+    tracker = tracker or JobTracker(JOB_STATE_PATH)
+    todo = tracker.unfinished(species_list, sources)
+    print(f"{len(todo)} unfinished jobs ({len(species_list)} species x {len(sources)} sources), {workers} workers")
+
+    jobs = queue.Queue()
+    for item in todo:
+        jobs.put(item)
+    for _ in range(workers):
+        jobs.put(None)
+
+    threads = [threading.Thread(target=worker, args=(jobs, tracker, sync), daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return tracker.counts()
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape many Pokémon from Bulbapedia, Zerochan and Danbooru in parallel.")
+    parser.add_argument('species', nargs='*', help="Species to scrape (default: every species in pokemon_data.csv)")
+    parser.add_argument('--sources', nargs='+', choices=SOURCES, default=list(SOURCES))
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--sync', action='store_true', help="Only fetch entries newer than the last run")
+    parser.add_argument('--restart', action='store_true', help="Forget recorded job progress and run every job again")
+    args = parser.parse_args()
+
+    tracker = JobTracker(JOB_STATE_PATH)
+    if args.restart:
+        tracker.reset()
+
+    species_list = args.species or load_species()
+    totals = run(species_list, args.sources, args.workers, args.sync, tracker)
+    print(f"\nOrchestrator finished: {totals.get('done', 0)} jobs done, {totals.get('failed', 0)} failed.")
+    print(f"Job progress is kept in {JOB_STATE_PATH}; re-run to retry anything not done.")
+    if 'bulbapedia' in args.sources or 'zerochan' in args.sources:
+        bulbapedia_scraper.TRACE.summary("Bulbapedia / Zerochan jobs")
+    if 'danbooru' in args.sources:
+        danbooru_scraper.TRACE.summary("Danbooru jobs")
@@ -0,0 +1,47 @@
+import os
+
+# --- Configuration ---
+# Danbooru tags of the Pokemon whose tag isn't simply the name with '_' separators
+POKEMON_TAG_MAP = {
+    "Clodsire": "clodsire",
+    "Rotom-Mow": "rotom_(mow)",
+    "Rotom-Frost": "rotom_(frost)",
+    "Blaziken-Mega": "mega_blaziken",
+    "Obstagoon": "obstagoon",
+    "Meloetta-Aria": "meloetta_(aria)",
+}
+
+# Scraper output roots, one directory per Pokemon in each (Danbooru: per tag)
+DANBOORU_DIR = "./pokemon_pics/web_scrape"
+BULBAPEDIA_DIR = "/home/atvars/School/advanced_ai/Pokemon/pokemon_pics/web_scrape_2"
+
+# Names of the DedupIndex database and content store inside each root
+DEDUP_DB_NAME = "dedup_index.sqlite"
+STORE_DIR_NAME = "_store"
+# --- End Configuration ---
+
+
+def booru_tag(pokemon_name):
+    """Danbooru tag for a Pokemon name: POKEMON_TAG_MAP if listed there, else 'mr-mime' -> 'mr_mime'."""
+    for name, tag in POKEMON_TAG_MAP.items():
+        if name.lower() == pokemon_name.lower():
+            return tag
+    return pokemon_name.lower().replace('-', '_').replace(' ', '_')
+
+
+def pokemon_for_tag(tag):
+    """Inverse of booru_tag(): 'rotom_(mow)' -> 'rotom-mow', 'mega_blaziken' -> 'blaziken-mega', 'mr_mime' -> 'mr-mime'.
+
+    Also accepts names that are already Pokemon names ('Rotom-Mow', 'rotom-mow'), so any
+    species directory or class name can be passed through it.
+    """
+    tag = tag.strip().lower().replace(' ', '_')
+    for name, mapped in POKEMON_TAG_MAP.items():
+        if mapped == tag:
+            return name.lower()
+    return tag.replace('_', '-')
+
+
+def dedup_paths(root):
+    """(database path, store directory) of the DedupIndex kept in a scraper output root."""
+    return os.path.join(root, DEDUP_DB_NAME), os.path.join(root, STORE_DIR_NAME)
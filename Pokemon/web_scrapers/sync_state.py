@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+
+RESUME_KEY = "_resume" # Top-level key of the unfinished walks, next to the per-source marks
+
+
+def capped_mark(newest_id, failed_ids):
+    """The mark a run may store: its newest id, but below the oldest item that failed so a sync retries it."""
+    if not failed_ids:
+        return newest_id
+    cap = min(failed_ids) - 1
+    return cap if newest_id is None else min(newest_id, cap)
+
+
+class SyncState:
+    """High-water marks (newest item seen) per source and tag, persisted as JSON between runs.
+
+    Both Danbooru and Zerochan list newest items first, so a sync run can stop paging as
+    soon as it reaches an item at or below the stored mark. A sync run that stops before
+    that (item limit, page limit, a page that kept failing) must not raise the mark, or the
+    items between the mark and the oldest one it listed would never be fetched. It leaves
+    a resume point instead: where its listing stopped, the mark it started from and the
+    mark to store once a later run has walked the rest of the gap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._marks = None
+
+    def _load(self):
+        if self._marks is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._marks = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._marks = {}
+        return self._marks
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._marks, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, source, key):
+        """Returns the stored mark for source/key, or None if it was never synced."""
+        with self._lock:
+            return self._load().get(source, {}).get(key)
+
+    def update(self, source, key, value):
+        """Raises the mark for source/key to `value` (never lowers it) and saves the file."""
+        if value is None:
+            return
+        with self._lock:
+            marks = self._load().setdefault(source, {})
+            if marks.get(key) is not None and marks[key] >= value:
+                return
+            marks[key] = value
+            self._save()
+
+    def get_resume(self, source, key):
+        """The unfinished walk of an earlier sync run as {'cursor', 'since', 'newest'}, or None."""
+        with self._lock:
+            return self._load().get(RESUME_KEY, {}).get(source, {}).get(key)
+
+    def finish_walk(self, source, key, since, newest, complete, cursor=None):
+        """Records the end of a sync run's listing walk.
+
+        complete: the walk reached `since` (or the end of the listing), so the mark is raised
+        to `newest` and any resume point is cleared. Otherwise, if it listed anything,
+        `cursor` (where the next run continues) is stored with `since` and `newest`.
+        """
+        if complete:
+            with self._lock:
+                resume = self._load().get(RESUME_KEY, {}).get(source, {})
+                if resume.pop(key, None) is not None:
+                    self._save()
+            self.update(source, key, newest)
+        elif cursor is not None:
+            with self._lock:
+                resume = self._load().setdefault(RESUME_KEY, {}).setdefault(source, {})
+                resume[key] = {'cursor': cursor, 'since': since, 'newest': newest}
+                self._save()
@@ -0,0 +1,141 @@
+"""Seconds per generation: the notebook's list-based GA vs. tsp_ga_engine, on random instances.
+
+Usage:
+    python bench_tsp_ga.py                                     # 10, 15, 100, 1000 cities
+    python bench_tsp_ga.py --cities 1000 2000 --population 2000 --generations 50
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+import tsp_ga_engine
+
+# --- Baseline: the functions from TSP_Genetic_Algorithm_Questions.ipynb, unchanged apart from setup ---
+city_coords = {}
+cities_names = []
+
+
+def initial_population(cities_list, n_population=250):
+    population_perms = []
+    for i in range(n_population):
+        cities = cities_list.copy()
+        random.shuffle(cities)
+        population_perms.append(cities)
+    return population_perms
+
+
+def dist_two_cities(city_1, city_2):
+    x1, y1 = city_coords[city_1]
+    x2, y2 = city_coords[city_2]
+    return np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+
+
+def total_dist_individual(individual):
+    total_dist = 0
+    for i in range(len(individual) - 1):
+        total_dist += dist_two_cities(individual[i], individual[i + 1])
+    total_dist += dist_two_cities(individual[-1], individual[0])
+    return total_dist
+
+
+def fitness_prob(population):
+    total_dist_all_individuals = []
+    for i in range(0, len(population)):
+        total_dist_all_individuals.append(total_dist_individual(population[i]))
+    max_population_cost = max(total_dist_all_individuals)
+    population_fitness = max_population_cost - np.array(total_dist_all_individuals)
+    return population_fitness / sum(population_fitness)
+
+
+def roulette_wheel(population, fitness_probs):
+    total_fitness = sum(fitness_probs)
+    relative_fitness = [f / total_fitness for f in fitness_probs]
+    cumulative_probabilities = np.cumsum(relative_fitness)
+    r = random.random()
+    selected_individual_index = len(population) - 1
+    for i, individual in enumerate(population):
+        if r < cumulative_probabilities[i]:
+            selected_individual_index = i
+            break
+    return population[selected_individual_index]
+
+
+def crossover(parent_1, parent_2):
+    cut = round(random.uniform(1, len(cities_names) - 1))
+    offspring_1 = parent_1[0:cut]
+    offspring_1 += [city for city in parent_2 if city not in offspring_1]
+    offspring_2 = parent_2[0:cut]
+    offspring_2 += [city for city in parent_1 if city not in offspring_2]
+    return offspring_1, offspring_2
+
+
+def mutation(offspring):
+    i, j = random.sample(range(len(offspring)), 2)
+    offspring[i], offspring[j] = offspring[j], offspring[i]
+    return offspring
+
+
+def breed_baseline(population, n_population, crossover_per, mutation_per):
+    fitness_probs = fitness_prob(population)
+    parents_list = [roulette_wheel(population, fitness_probs) for _ in range(int(crossover_per * n_population))]
+    offspring_list = []
+    for i in range(0, len(parents_list) - 1, 2):
+        offspring_1, offspring_2 = crossover(parents_list[i], parents_list[i + 1])
+        if random.random() > (1 - mutation_per):
+            offspring_1 = mutation(offspring_1)
+        if random.random() > (1 - mutation_per):
+            offspring_2 = mutation(offspring_2)
+        offspring_list += [offspring_1, offspring_2]
+    return parents_list + offspring_list
+
+
+def run_ga_baseline(n_population, n_generations, crossover_per, mutation_per):
+    population = initial_population(cities_names, n_population)
+    best_mixed_offsrping = population
+    for _ in range(n_generations):
+        mixed_offspring = breed_baseline(best_mixed_offsrping, n_population, crossover_per, mutation_per)
+        fitness_probs = fitness_prob(mixed_offspring)
+        best = np.argsort(fitness_probs)[::-1][0:int(0.8 * n_population)]
+        best_mixed_offsrping = [mixed_offspring[i] for i in best]
+        best_mixed_offsrping += [population[random.randint(0, n_population - 1)] for _ in range(int(0.2 * n_population))]
+        random.shuffle(best_mixed_offsrping)
+    return min(total_dist_individual(individual) for individual in best_mixed_offsrping)
+
+
+def random_instance(n_cities, seed):
+    rng = np.random.default_rng(seed)
+    return rng.random((n_cities, 2)) * 100
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cities', nargs='+', type=int, default=[10, 15, 100, 1000])
+    parser.add_argument('--population', type=int, default=250)
+    parser.add_argument('--generations', type=int, default=200)
+    parser.add_argument('--baseline-generations', type=int, default=5, help="The list version is timed on fewer generations")
+    parser.add_argument('--baseline-max-cities', type=int, default=1000, help="Skip the list version above this size")
+    args = parser.parse_args()
+
+    print(f"population {args.population}, crossover 0.8, mutation 0.2")
+    print(f"{'cities':>7}{'list s/gen':>12}{'array s/gen':>13}{'speedup':>9}{'array best (all gens)':>23}")
+    for n_cities in args.cities:
+        coords = random_instance(n_cities, seed=n_cities)
+
+        start = time.perf_counter()
+        _, lengths = tsp_ga_engine.run_ga(coords, args.population, args.generations, 0.8, 0.2, seed=0)
+        array_time = (time.perf_counter() - start) / args.generations
+
+        list_time = None
+        if n_cities <= args.baseline_max_cities:
+            cities_names = [f"city_{i}" for i in range(n_cities)]
+            city_coords = dict(zip(cities_names, map(tuple, coords)))
+            random.seed(0)
+            start = time.perf_counter()
+            run_ga_baseline(args.population, args.baseline_generations, 0.8, 0.2)
+            list_time = (time.perf_counter() - start) / args.baseline_generations
+
+        list_column = f"{list_time:>12.4f}" if list_time else f"{'skipped':>12}"
+        speedup_column = f"{list_time / array_time:>8.0f}x" if list_time else f"{'':>9}"
+        print(f"{n_cities:>7}{list_column}{array_time:>13.4f}{speedup_column}{lengths.min():>23.1f}")
@@ -0,0 +1,113 @@
+"""Array-backed version of the TSP genetic algorithm from TSP_Genetic_Algorithm_Questions.ipynb.
+
+Same algorithm and parameters as the notebook's run_ga (roulette wheel selection,
+crossover, swap mutation, 80% elitism + 20% individuals from the initial
+population), but the population is an int matrix of city indices (one row per
+individual) and every step works on the whole matrix at once:
+
+    distances     one gather from a precomputed distance matrix and a row sum
+    selection     one vectorized draw for all parents
+    crossover     order crossover (OX) for every parent pair with boolean masks
+    mutation      swap mutation for every mutated row with fancy indexing
+
+Usage from the notebook:
+    from tsp_ga_engine import run_ga
+    tours, distances = run_ga(list(zip(x, y)), n_population, n_generations, crossover_per, mutation_per)
+    shortest_path = [cities_names[i] for i in tours[distances.argmin()]]
+"""
+import numpy as np
+
+
+def distance_matrix(coords):
+    """(n, n) Euclidean distances between all cities, computed once."""
+    coords = np.asarray(coords, dtype=np.float64)
+    deltas = coords[:, None, :] - coords[None, :, :]
+    return np.sqrt((deltas ** 2).sum(axis=-1))
+
+
+def initial_population(n_cities, n_population, rng):
+    """n_population random permutations of range(n_cities), one per row."""
+    return np.argsort(rng.random((n_population, n_cities)), axis=1).astype(np.int32)
+
+
+def total_distances(population, distances):
+    """Closed-tour length of every row: one gather over all edges, including last -> first."""
+    return distances[population, np.roll(population, -1, axis=1)].sum(axis=1)
+
+
+def fitness_prob(tour_lengths):
+    """Selection probabilities, as in the notebook: (max length - length), normalized."""
+    fitness = tour_lengths.max() - tour_lengths
+    total = fitness.sum()
+    return fitness / total if total > 0 else np.full(len(tour_lengths), 1 / len(tour_lengths))
+
+
+def roulette_wheel(fitness_probs, count, rng):
+    """Indices of `count` parents drawn proportionally to fitness: one cumulative sum for all draws."""
+    cumulative = np.cumsum(fitness_probs)
+    return np.minimum(np.searchsorted(cumulative, rng.random(count) * cumulative[-1], side='right'), len(cumulative) - 1)
+
+
+def order_crossover(parents_1, parents_2, rng):
+    """OX for every row pair: the child keeps a random slice of parent 1 in place and takes the
+    remaining cities in parent 2's order. Works on (k, n) matrices without a per-child loop."""
+    k, n = parents_1.shape
+    rows = np.arange(k)[:, None]
+    cuts = np.sort(rng.integers(0, n + 1, size=(k, 2)), axis=1)
+    positions = np.arange(n)
+    in_slice = (positions >= cuts[:, :1]) & (positions < cuts[:, 1:]) # (k, n) positions kept from parent 1
+
+    # City-indexed mask of the cities in each row's slice
+    taken = np.zeros((k, n), dtype=bool)
+    taken[np.broadcast_to(rows, (k, n))[in_slice], parents_1[in_slice]] = True
+    from_parent_2 = ~taken[rows, parents_2] # Parent 2's cities that are still missing, in its order
+
+    children = parents_1.copy()
+    # Row-major order lines each row's free positions up with that row's missing cities
+    children[~in_slice] = parents_2[from_parent_2]
+    return children
+
+
+def swap_mutation(population, mutation_per, rng):
+    """Swaps two random cities in each row with probability mutation_per (in place)."""
+    mutated = np.flatnonzero(rng.random(len(population)) < mutation_per)
+    if len(mutated):
+        i = rng.integers(0, population.shape[1], size=len(mutated))
+        j = rng.integers(0, population.shape[1], size=len(mutated))
+        population[mutated, i], population[mutated, j] = population[mutated, j], population[mutated, i]
+    return population
+
+
+def breed(population, tour_lengths, crossover_per, mutation_per, rng):
+    """Parents by roulette wheel, two children per pair, then mutation. Returns parents + offspring."""
+    n_parents = int(crossover_per * len(population)) // 2 * 2
+    parents = population[roulette_wheel(fitness_prob(tour_lengths), n_parents, rng)]
+    parents_1, parents_2 = parents[0::2], parents[1::2]
+    offspring = np.concatenate([order_crossover(parents_1, parents_2, rng), order_crossover(parents_2, parents_1, rng)])
+    swap_mutation(offspring, mutation_per, rng)
+    return np.concatenate([parents, offspring])
+
+
+def run_ga(coords, n_population, n_generations, crossover_per, mutation_per, seed=None):
+    """Runs the GA on city coordinates. Returns (final population (n_population, n) int32, tour lengths)."""
+    rng = np.random.default_rng(seed)
+    distances = distance_matrix(coords)
+    population = initial_population(len(distances), n_population, rng)
+
+    # First generation: keep the best n_population of parents + offspring
+    mixed_offspring = breed(population, total_distances(population, distances), crossover_per, mutation_per, rng)
+    mixed_lengths = total_distances(mixed_offspring, distances)
+    best = mixed_offspring[np.argsort(mixed_lengths)[:n_population]]
+
+    n_elite = int(0.8 * n_population)
+    n_old = int(0.2 * n_population)
+    for _ in range(n_generations):
+        mixed_offspring = breed(best, total_distances(best, distances), crossover_per, mutation_per, rng)
+        mixed_lengths = total_distances(mixed_offspring, distances)
+        elite = mixed_offspring[np.argsort(mixed_lengths)[:n_elite]]
+        # Exploration: individuals from the initial population, as in the notebook
+        old = population[rng.integers(0, n_population, size=n_old)]
+        best = np.concatenate([elite, old])
+        rng.shuffle(best)
+
+    return best, total_distances(best, distances)
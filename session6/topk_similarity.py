@@ -0,0 +1,225 @@
+"""Top-k neighbour index for the content-based recommender in Session_6_Assignment.ipynb.
+
+The notebook builds the full N x N matrix with linear_kernel / cosine_similarity, which
+is why it has to stop at bookinfo_slice = merged_bookinfo.iloc[:20000], and
+get_recommendations sorts a whole row for every query. Here only the k best
+neighbours of each item are kept:
+
+    build      the sparse matrix is multiplied against itself one block of rows at a
+               time; each dense block is reduced with argpartition and only its k
+               winners are sorted. Peak memory is one block (BLOCK_ELEMENTS floats)
+               plus the N x k int32/float32 neighbour table.
+    query      a row slice of the table.
+    append     new items get their own top-k against the whole catalog, and every
+               existing row merges its k neighbours with the scores against the new
+               items only, so nothing is recomputed from scratch.
+
+Rows are L2-normalized, so the scores are cosine similarities for both the TF-IDF
+matrix (linear_kernel) and the count matrix (cosine_similarity).
+
+Usage from the notebook:
+    from topk_similarity import TopKIndex
+    index = TopKIndex.build(tfidf.fit_transform(merged_bookinfo['description'].fillna('')), k=10)
+
+    def get_recommendations(title, index=index):
+        neighbours, _ = index.neighbours_of(indices[title])
+        return merged_bookinfo['Title'].iloc[neighbours]
+
+    index.append(tfidf.transform(new_books['description'].fillna(''))) # Vocabulary and idf stay those of the fit
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+K = 10 # Neighbours kept per item (get_recommendations returns 10)
+BLOCK_ELEMENTS = 1 << 24 # Similarity scores per block (64 MB as float32; the sparse product before toarray() is ~3x that)
+
+
+def _top_k(scores, k):
+    """Column positions and scores of the k highest entries of every row, best first.
+
+    argpartition is O(columns) per row; only the k selected entries are sorted.
+    Rows with fewer than k candidates are padded with position -1 and score -inf.
+    """
+    rows, columns = scores.shape
+    if columns > k:
+        positions = np.argpartition(scores, columns - k, axis=1)[:, columns - k:]
+    else:
+        positions = np.broadcast_to(np.arange(columns), (rows, columns))
+    top_scores = np.take_along_axis(scores, positions, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    positions = np.take_along_axis(positions, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    if columns < k:
+        positions = np.pad(positions, ((0, 0), (0, k - columns)), constant_values=-1)
+        top_scores = np.pad(top_scores, ((0, 0), (0, k - columns)), constant_values=-np.inf)
+    positions = np.where(np.isneginf(top_scores), -1, positions)
+    return positions.astype(np.int32), top_scores.astype(np.float32)
+
+
+def block_top_k(queries, corpus, k, first_id=0):
+    """Top-k neighbours in `corpus` of every row of `queries`, computed in row blocks.
+
+    `queries` row r is `corpus` row first_id + r when the queries are part of the
+    corpus (that entry is excluded, an item is not its own recommendation);
+    pass first_id=None when they are not.
+    """
+    corpus_t = corpus.T.tocsr()
+    block_rows = max(1, BLOCK_ELEMENTS // max(corpus.shape[0], 1))
+    neighbours = np.empty((queries.shape[0], k), dtype=np.int32)
+    scores = np.empty((queries.shape[0], k), dtype=np.float32)
+    for start in range(0, queries.shape[0], block_rows):
+        stop = min(start + block_rows, queries.shape[0])
+        block = (queries[start:stop] @ corpus_t).toarray().astype(np.float32, copy=False)
+        if first_id is not None:
+            block[np.arange(stop - start), first_id + np.arange(start, stop)] = -np.inf
+        neighbours[start:stop], scores[start:stop] = _top_k(block, k)
+    return neighbours, scores
+
+
+class TopKIndex:
+    """The k most similar items of every item: neighbours (N, k) int32 and scores (N, k) float32.
+
+    Row i lists item ids (row numbers of the matrix it was built from) best first;
+    -1 / -inf fill the rows of catalogs with fewer than k + 1 items.
+    """
+
+    def __init__(self, matrix, neighbours, scores):
+        self.matrix = matrix # L2-normalized CSR rows, kept for append()
+        self.neighbours = neighbours
+        self.scores = scores
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    def __len__(self):
+        return self.neighbours.shape[0]
+
+    @classmethod
+    def build(cls, matrix, k=K):
+        """Index of a sparse (items x features) matrix, e.g. tfidf_matrix or count_matrix."""
+        matrix = normalize(sparse.csr_matrix(matrix, dtype=np.float32))
+        neighbours, scores = block_top_k(matrix, matrix, k)
+        return cls(matrix, neighbours, scores)
+
+    def neighbours_of(self, item, n=None):
+        """(item ids, scores) of the n (default k) most similar items, best first."""
+        ids = self.neighbours[item, :n]
+        valid = ids >= 0
+        return ids[valid], self.scores[item, :n][valid]
+
+    def append(self, new_matrix):
+        """Adds items (rows in the same feature space) as ids len(self) onwards. Returns their ids."""
+        new_matrix = normalize(sparse.csr_matrix(new_matrix, dtype=np.float32))
+        n_old, n_new = self.matrix.shape[0], new_matrix.shape[0]
+        combined = sparse.vstack([self.matrix, new_matrix], format='csr')
+        new_neighbours, new_scores = block_top_k(new_matrix, combined, self.k, first_id=n_old)
+
+        # Existing rows: merge the current k neighbours with the scores against the new items only
+        neighbours = np.array(self.neighbours) # Writable copies, the loaded tables may be memory-mapped
+        scores = np.array(self.scores)
+        new_ids = np.arange(n_old, n_old + n_new, dtype=np.int32)
+        new_t = new_matrix.T.tocsr()
+        block_rows = max(1, BLOCK_ELEMENTS // (n_new + self.k))
+        for start in range(0, n_old, block_rows):
+            stop = min(start + block_rows, n_old)
+            candidates = np.hstack([scores[start:stop], (self.matrix[start:stop] @ new_t).toarray()])
+            candidate_ids = np.hstack([neighbours[start:stop], np.broadcast_to(new_ids, (stop - start, n_new))])
+            positions, scores[start:stop] = _top_k(candidates, self.k)
+            neighbours[start:stop] = np.where(positions >= 0, np.take_along_axis(candidate_ids, np.maximum(positions, 0), axis=1), -1)
+
+        self.matrix = combined
+        self.neighbours = np.concatenate([neighbours, new_neighbours])
+        self.scores = np.concatenate([scores, new_scores])
+        return new_ids
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        sparse.save_npz(os.path.join(directory, "matrix.npz"), self.matrix)
+        np.save(os.path.join(directory, "neighbours.npy"), self.neighbours)
+        np.save(os.path.join(directory, "scores.npy"), self.scores)
+        with open(os.path.join(directory, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump({'items': len(self), 'k': self.k}, f)
+
+    @classmethod
+    def load(cls, directory):
+        """Loads a saved index; the neighbour table is memory-mapped."""
+        return cls(sparse.load_npz(os.path.join(directory, "matrix.npz")).tocsr(),
+                   np.load(os.path.join(directory, "neighbours.npy"), mmap_mode='r'),
+                   np.load(os.path.join(directory, "scores.npy"), mmap_mode='r'))
+
+
+def dense_top_k(matrix, k):
+    """The notebook's approach, for comparison: full N x N cosine matrix, then a full sort of every row."""
+    matrix = normalize(sparse.csr_matrix(matrix, dtype=np.float32))
+    cosine_sim = (matrix @ matrix.T).toarray()
+    np.fill_diagonal(cosine_sim, -np.inf)
+    return np.argsort(-cosine_sim, axis=1, kind='stable')[:, :k]
+
+
+def random_corpus(n_items, n_features=20000, words_per_item=40, seed=0):
+    """Sparse bag-of-words-like matrix with Zipf-distributed word ids, as a stand-in for tfidf_matrix."""
+    rng = np.random.default_rng(seed)
+    columns = np.minimum(rng.zipf(1.3, size=n_items * words_per_item) - 1, n_features - 1)
+    rows = np.repeat(np.arange(n_items), words_per_item)
+    return sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=(n_items, n_features))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a top-k similarity index over book descriptions, or benchmark one.")
+    parser.add_argument('--books', help="books_data.csv from the Kaggle dataset; index every description instead of benchmarking")
+    parser.add_argument('--out', default="books_topk", help="Directory the --books index is saved to")
+    parser.add_argument('--items', type=int, default=50000, help="Benchmark corpus size")
+    parser.add_argument('--dense-items', type=int, default=5000, help="Corpus size for the dense comparison")
+    parser.add_argument('-k', type=int, default=K)
+    args = parser.parse_args()
+
+    if args.books:
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        books = pd.read_csv(args.books)
+        tfidf_matrix = TfidfVectorizer(stop_words='english').fit_transform(books['description'].fillna(''))
+        start = time.perf_counter()
+        index = TopKIndex.build(tfidf_matrix, args.k)
+        print(f"Indexed {len(index)} books in {time.perf_counter() - start:.1f}s")
+        index.save(args.out)
+        print(f"Saved to {os.path.abspath(args.out)}")
+    else:
+        corpus = random_corpus(args.dense_items)
+        start = time.perf_counter()
+        expected = dense_top_k(corpus, args.k)
+        dense_time = time.perf_counter() - start
+        start = time.perf_counter()
+        index = TopKIndex.build(corpus, args.k)
+        block_time = time.perf_counter() - start
+        agreement = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(expected, index.neighbours)])
+        print(f"{args.dense_items} items: dense matrix + full sort {dense_time:.2f}s, blocked top-k {block_time:.2f}s, "
+              f"neighbour agreement {agreement:.1%} (ties between equal scores may differ)")
+
+        corpus = random_corpus(args.items + 1000, seed=1)
+        start = time.perf_counter()
+        index = TopKIndex.build(corpus[:args.items], args.k)
+        build_time = time.perf_counter() - start
+        table_mb = (index.neighbours.nbytes + index.scores.nbytes) / 1e6
+        print(f"{args.items} items: built in {build_time:.2f}s, neighbour table {table_mb:.1f} MB "
+              f"(dense matrix would be {args.items ** 2 * 4 / 1e9:.1f} GB)")
+
+        queries = np.random.default_rng(0).integers(0, len(index), size=100000)
+        start = time.perf_counter()
+        for item in queries:
+            index.neighbours_of(item)
+        print(f"  query: {(time.perf_counter() - start) / len(queries) * 1e6:.1f} µs")
+
+        start = time.perf_counter()
+        index.append(corpus[args.items:])
+        append_time = time.perf_counter() - start
+        rebuilt = TopKIndex.build(corpus, args.k)
+        same = np.mean(index.scores == rebuilt.scores)
+        print(f"  append 1000 items: {append_time:.2f}s (rebuild {build_time:.2f}s+), scores equal to a rebuild: {same:.1%}")